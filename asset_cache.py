@@ -0,0 +1,107 @@
+import pygame
+from collections import OrderedDict
+
+# Computes the largest size that fits inside the box while keeping the image proportions
+def fit_size(native_size, box):
+    original_width, original_height = native_size
+    scale_factor = min(box[0] / original_width, box[1] / original_height)
+    return int(original_width * scale_factor), int(original_height * scale_factor)
+
+class AssetCache:
+    # Constants declaration
+    DEFAULT_BUDGET = 32 * 1024 * 1024  # Bytes of pixel data kept in memory
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET, pack=None):
+        self.budget_bytes = budget_bytes
+        self.pack = pack  # Optional AssetPack with images already scaled to the sizes the game uses
+        self.surfaces = OrderedDict()  # (path, size) -> surface, least recently used first
+        self.native_sizes = {}  # path -> size of the image on disk
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Returns the image at the given size (or its original size if none is given)
+    def get(self, path, size=None, image=None):
+        key = (path, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        if image is None and self.pack is not None:
+            image = self.pack.get(path, size)
+        if image is None:
+            image = self.decode(path)
+        if size is not None and image.get_size() != size:
+            image = pygame.transform.scale(image, size)
+        self.store(key, image)
+        return image
+
+    # Returns the image scaled to fit inside the box, the way the shelf and the prize popup display it
+    def get_fitted(self, path, box):
+        image = None
+        self.learn_native_size(path)
+        if path not in self.native_sizes:
+            image = self.decode(path)  # First sight of this image, decode it once to learn its size
+        return self.get(path, fit_size(self.native_sizes[path], box), image)
+
+    # Returns the size the image would have inside the box (decoding it only if neither the cache nor the pack knows it)
+    def fitted_size(self, path, box):
+        self.learn_native_size(path)
+        if path not in self.native_sizes:
+            # Keep the decoded image fitted to the box, the shelf asks get_fitted for it right after laying it out
+            image = self.decode(path)
+            size = fit_size(self.native_sizes[path], box)
+            self.get(path, size, image)
+            return size
+        return fit_size(self.native_sizes[path], box)
+
+    # Takes the original size from the asset pack index when it is there, which avoids decoding the image
+    def learn_native_size(self, path):
+        if path not in self.native_sizes and self.pack is not None:
+            native_size = self.pack.native_size(path)
+            if native_size is not None:
+                self.native_sizes[path] = native_size
+
+    # Loads the image from disk and remembers its original size
+    def decode(self, path):
+        image = pygame.image.load(path).convert_alpha()
+        self.native_sizes[path] = image.get_size()
+        return image
+
+    # Adds a surface to the cache, evicting the least recently used ones to stay within budget
+    def store(self, key, surface):
+        size_bytes = self.surface_bytes(surface)
+        if size_bytes > self.budget_bytes:
+            return  # Would never fit, hand it out without caching it
+        self.surfaces[key] = surface
+        self.used_bytes += size_bytes
+        while self.used_bytes > self.budget_bytes:
+            _, evicted = self.surfaces.popitem(last=False)
+            self.used_bytes -= self.surface_bytes(evicted)
+            self.evictions += 1
+
+    @staticmethod
+    def surface_bytes(surface):
+        width, height = surface.get_size()
+        return width * height * surface.get_bytesize()
+
+    def clear(self):
+        self.surfaces.clear()
+        self.used_bytes = 0
+
+    # Returns the cache counters (the F3 overlay shows the hits and misses)
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self.surfaces),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.budget_bytes,
+        }
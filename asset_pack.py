@@ -0,0 +1,80 @@
+import os
+import mmap
+import json
+import struct
+import pygame
+
+# Pack of pre-scaled images stored as raw RGBA pixels, built by build_asset_pack.py
+ASSET_PACK_FILE = "assets.pack"
+MAGIC = b"GACHAPK1"
+HEADER = struct.Struct("<8sI")  # Magic, length of the JSON index that follows
+ALIGNMENT = 64  # Pixel data of every image starts on this boundary
+
+def image_key(path, size):
+    return "%s|%dx%d" % (path, size[0], size[1])
+
+class AssetPack:
+    def __init__(self, filename=ASSET_PACK_FILE):
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)  # Shared with other processes through the page cache
+        magic, index_length = HEADER.unpack_from(self.map, 0)  # struct.error if the file is shorter than the header
+        if magic != MAGIC:
+            raise ValueError("%s is not an asset pack" % filename)
+        if HEADER.size + index_length > len(self.map):
+            raise ValueError("%s is truncated" % filename)
+        index = json.loads(bytes(self.map[HEADER.size:HEADER.size + index_length]))
+        self.images = index["images"]  # "path|WxH" -> [offset, width, height]
+        self.native_sizes = {path: tuple(size) for path, size in index["native_sizes"].items()}
+        self.sources = index["sources"]  # path -> [mtime_ns, size] of the PNG it was built from
+        for offset, width, height in self.images.values():
+            if offset < 0 or offset + width * height * 4 > len(self.map):
+                raise ValueError("%s is truncated" % filename)  # A short write would hand out pixels past the end
+        self.view = memoryview(self.map)
+
+    # Opens the pack if it exists and was built from the current images, otherwise returns None
+    @classmethod
+    def open(cls, filename=ASSET_PACK_FILE):
+        try:
+            pack = cls(filename)
+        except (OSError, ValueError, struct.error):
+            return None
+        return pack if pack.is_current() else None
+
+    def is_current(self):
+        for path, (mtime_ns, size) in self.sources.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return False
+        return True
+
+    # Returns a surface over the mapped pixels (no decoding, no copy), or None if the pack doesn't have it
+    def get(self, path, size=None):
+        if size is None:
+            size = self.native_sizes.get(path)
+            if size is None:
+                return None
+        entry = self.images.get(image_key(path, size))
+        if entry is None:
+            return None
+        offset, width, height = entry
+        return pygame.image.frombuffer(self.view[offset:offset + width * height * 4], (width, height), "RGBA")
+
+    def native_size(self, path):
+        return self.native_sizes.get(path)
+
+# Loads an image from the asset pack when it has it, otherwise decodes the PNG (and scales it if a size is given)
+# Pack pixels are RGBA while the display is BGRA, so every blit from them swizzles each pixel: sprites drawn every frame
+# pass convert=True for a copy in the display's format (still no decoding), rarely drawn images keep the zero-copy surface
+def load_image(path, size=None, pack=None, convert=False):
+    image = pack.get(path, size) if pack is not None else None
+    if image is not None and convert:
+        image = image.convert_alpha()
+    if image is None:
+        image = pygame.image.load(path).convert_alpha()
+        if size is not None and image.get_size() != tuple(size):
+            image = pygame.transform.scale(image, size)
+    return image
@@ -0,0 +1,98 @@
+import numpy as np
+
+class BallStore:
+    # Constants declaration
+    INITIAL_CAPACITY = 32
+
+    def __init__(self, capacity=INITIAL_CAPACITY, rng=None):
+        self.balls = []  # GachaBall objects, in drawing order
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        # Per-ball state, row i belongs to self.balls[i] (refreshed once per physics step)
+        self.positions = np.zeros((capacity, 2))
+        self.previous_positions = np.zeros((capacity, 2))
+        self.angles = np.zeros(capacity)
+        self.previous_angles = np.zeros(capacity)
+
+        # Scratch buffers for interpolated drawing, reused every frame
+        self.draw_positions = np.zeros((capacity, 2))
+        self.draw_angles = np.zeros(capacity)
+
+    # List-like interface, so the store can be used wherever the gacha_prizes list was
+    def __len__(self):
+        return len(self.balls)
+
+    def __iter__(self):
+        return iter(self.balls)
+
+    def __getitem__(self, index):
+        return self.balls[index]
+
+    def __contains__(self, gacha_ball):
+        return gacha_ball in self.balls
+
+    def append(self, gacha_ball):
+        index = len(self.balls)
+        if index == len(self.positions):
+            self.grow()
+        self.balls.append(gacha_ball)
+        self.sync_ball(index)
+        self.previous_positions[index] = self.positions[index]
+        self.previous_angles[index] = self.angles[index]
+
+    def remove(self, gacha_ball):
+        index = self.balls.index(gacha_ball)
+        del self.balls[index]
+        count = len(self.balls)
+        for array in (self.positions, self.previous_positions, self.angles, self.previous_angles):
+            array[index:count] = array[index + 1:count + 1]
+
+    # Doubles the capacity of every array
+    def grow(self):
+        for name in ("positions", "previous_positions", "angles", "previous_angles", "draw_positions", "draw_angles"):
+            array = getattr(self, name)
+            grown = np.zeros((len(array) * 2,) + array.shape[1:])
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def sync_ball(self, index):
+        body = self.balls[index].body
+        self.positions[index] = body.position
+        self.angles[index] = body.angle
+
+    # Reads every body once after a physics step
+    def sync(self):
+        positions, angles = self.positions, self.angles
+        for index, gacha_ball in enumerate(self.balls):
+            body = gacha_ball.body
+            positions[index] = body.position
+            angles[index] = body.angle
+
+    # Remembers the state before a physics step (used to interpolate drawing)
+    def save_previous_state(self):
+        count = len(self.balls)
+        self.previous_positions[:count] = self.positions[:count]
+        self.previous_angles[:count] = self.angles[:count]
+
+    # Positions and angles between the last two physics steps, for every ball at once
+    def interpolated(self, alpha):
+        count = len(self.balls)
+        positions = self.draw_positions[:count]
+        angles = self.draw_angles[:count]
+        np.subtract(self.positions[:count], self.previous_positions[:count], out=positions)
+        positions *= alpha
+        positions += self.previous_positions[:count]
+        np.subtract(self.angles[:count], self.previous_angles[:count], out=angles)
+        angles *= alpha
+        angles += self.previous_angles[:count]
+        return positions, angles
+
+    # Apply random impulses to every gacha ball at once, from the store's seeded rng so replays shuffle the same way
+    def shuffle(self, intensity=500):
+        impulses = self.rng.uniform(-intensity, intensity, (len(self.balls), 2)).tolist()
+        for gacha_ball, impulse in zip(self.balls, impulses):
+            gacha_ball.body.apply_impulse_at_local_point(impulse)
+
+    # True once every ball has settled and fallen asleep (see the space's sleep thresholds)
+    def all_sleeping(self):
+        return all(gacha_ball.body.is_sleeping for gacha_ball in self.balls)
@@ -0,0 +1,391 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from datetime import datetime
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # No window, the benchmarks draw offscreen
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+import pymunk
+
+import main
+from main import SCREEN_WIDTH, PHYSICS_RATE, CLAW_MAX_VERTICES, CLAW_CONCAVE
+from cabinet import create_space
+from claw import Claw
+from gacha_ball import GachaBall
+from claw_hull import CLAW_IMAGES, get_claw_points_from_surface, get_claw_pieces_from_surface
+from asset_cache import AssetCache
+from text_cache import TextCache
+from prize_catalog import PrizeCatalog, load_catalog, prize_ids
+from save_journal import SaveJournal, save_game_data
+from save_format import SaveData
+from shelf_pages import ShelfPages
+from physics_governor import PRESETS, DEFAULT_PRESET, apply_preset
+from timestep import FixedTimestep
+
+# Benchmarks of the physics, grab, asset and save hot paths, compared against a JSON baseline
+#   python benchmark.py                      (fails if anything got slower than the baseline allows)
+#   python benchmark.py --update-baseline    (records this machine's figures as the new baseline)
+
+BASELINE_FILE = "benchmark-baseline.json"
+DEFAULT_THRESHOLD = 1.5  # A result this many times the baseline counts as a regression
+DEFAULT_REPEATS = 7  # Timed runs per benchmark, the median is reported
+MIN_BASELINE_MS = 0.05  # Timings below this are too noisy to flag on their own
+MIN_BASELINE_KIB = 16  # Same for allocations
+CLAW_VERTEX_BUDGET = 8  # Points per piece in the simplified claw benchmarks (opt-in in the game, see CLAW_MAX_VERTICES)
+
+# Interior of the container from create_container (walls are 50 px thick segments)
+BALL_X_RANGE = (40, SCREEN_WIDTH - 40)
+BALL_Y_RANGE = (200, 480)
+SHELF_COLUMNS = [[3, 5, 3], [3, 5, 3], [3, 5, 3], [3, 5, 3]]
+LARGE_SAVE_PRIZES = 5000  # Prizes in the synthetic catalog and save file
+
+benchmarks = []  # (name, setup), setup returns the function to time and how many calls one run makes
+temp_folders = []  # Scratch folders of the save benchmarks, removed once every benchmark has run
+
+def benchmark(name):
+    def register(setup):
+        benchmarks.append((name, setup))
+        return setup
+    return register
+
+# Makes a scratch folder that lives until the benchmarks are done
+def temp_folder():
+    folder = tempfile.TemporaryDirectory()
+    temp_folders.append(folder)
+    return folder.name
+
+# Fills a machine with balls scattered over the container and lets them push apart for a moment
+def filled_space(ball_count):
+    random.seed(ball_count)
+    space = create_space()
+    space.sleep_time_threshold = float("inf")  # Keep every ball awake, the cost of a pile in motion is what is measured
+    balls = []
+    for _ in range(ball_count):
+        ball = GachaBall(space)
+        ball.body.position = random.uniform(*BALL_X_RANGE), random.uniform(*BALL_Y_RANGE)
+        balls.append(ball)
+    for _ in range(30):
+        space.step(1 / PHYSICS_RATE)
+    return space, balls
+
+def load_claw_pieces(max_vertices=CLAW_MAX_VERTICES, concave=CLAW_CONCAVE):
+    images = [pygame.image.load(path) for path in CLAW_IMAGES]
+    claw_pieces_close_list = [get_claw_pieces_from_surface(image, max_vertices, concave) for image in images]
+    return claw_pieces_close_list, claw_pieces_close_list[::-1]
+
+def space_step(ball_count, steps):
+    space, _ = filled_space(ball_count)
+
+    def run():
+        for _ in range(steps):
+            space.step(1 / PHYSICS_RATE)
+    return run, steps
+
+@benchmark("space_step_20")
+def space_step_20():
+    return space_step(20, 60)
+
+@benchmark("space_step_200")
+def space_step_200():
+    return space_step(200, 20)
+
+@benchmark("space_step_2000")
+def space_step_2000():
+    return space_step(2000, 5)
+
+# 200 balls in motion under each of the other physics quality presets (create_space already sets up the default
+# preset, which space_step_200 measures)
+def space_step_preset(preset):
+    space, _ = filled_space(200)
+    timestep = FixedTimestep(PHYSICS_RATE)
+    apply_preset(space, timestep, preset)
+    space.sleep_time_threshold = float("inf")
+
+    def run():
+        for _ in range(20):
+            timestep.step_space(space)
+    return run, 20
+
+for preset in PRESETS:
+    if preset["name"] == DEFAULT_PRESET:
+        continue
+    benchmark("space_step_200_" + preset["name"])(lambda preset=preset: space_step_preset(preset))
+
+@benchmark("check_grab_2000")
+def check_grab_2000():
+    space, balls = filled_space(2000)
+    claw = Claw(SCREEN_WIDTH, space, *load_claw_pieces())
+    positions = [(x, Claw.TARGET_Y) for x in range(100, SCREEN_WIDTH - 100, 5)]
+
+    def run():
+        for position in positions:
+            claw.body.position = position
+            claw.check_grab(balls)
+    return run, len(positions)
+
+@benchmark("update_claw_shape")
+def update_claw_shape():
+    space = create_space()
+    claw = Claw(SCREEN_WIDTH, space, *load_claw_pieces())
+    frames = [(animation, frame) for animation in ("close", "open") for frame in range(3)] * 50
+
+    def run():
+        for animation, frame in frames:
+            claw.current_frame = frame
+            claw.update_claw_shape(animation)
+    return run, len(frames)
+
+@benchmark("claw_points_from_surface")
+def claw_points_from_surface():
+    images = [pygame.image.load(path) for path in CLAW_IMAGES]
+
+    def run():
+        for image in images:
+            get_claw_points_from_surface(image)  # No hull cache, this is the work a cache miss does
+    return run, len(images)
+
+@benchmark("claw_pieces_concave")
+def claw_pieces_concave():
+    images = [pygame.image.load(path) for path in CLAW_IMAGES]
+
+    def run():
+        for image in images:
+            get_claw_pieces_from_surface(image, CLAW_VERTEX_BUDGET, concave=True)
+    return run, len(images)
+
+# Drags the closed claw through a pile of balls, one physics step per position (the claw's narrowphase tests)
+def claw_sweep(max_vertices, concave):
+    space, _ = filled_space(200)
+    claw = Claw(SCREEN_WIDTH, space, *load_claw_pieces(max_vertices, concave))
+    claw.current_frame = 2
+    claw.update_claw_shape("close")
+    positions = [(x, Claw.TARGET_Y) for x in range(100, SCREEN_WIDTH - 100, 25)]
+
+    def run():
+        for position in positions:
+            claw.body.position = position
+            space.step(1 / PHYSICS_RATE)
+    return run, len(positions)
+
+@benchmark("claw_sweep_full_hull")
+def claw_sweep_full_hull():
+    return claw_sweep(None, False)
+
+@benchmark("claw_sweep_hull")
+def claw_sweep_hull():
+    return claw_sweep(CLAW_VERTEX_BUDGET, False)
+
+@benchmark("claw_sweep_concave")
+def claw_sweep_concave():
+    return claw_sweep(CLAW_VERTEX_BUDGET, True)
+
+# Sets up the globals the shelf draws with, with every prize won so every image is drawn
+def shelf_globals():
+    prize_catalog = PrizeCatalog(load_catalog())
+    for prize_id in range(len(prize_catalog)):
+        prize_catalog.mark_won(prize_id)
+    main.text_cache = TextCache()
+    main.prize_cache = AssetCache()
+    main.prize_catalog = prize_catalog
+    return list(prize_catalog.sections.items())
+
+@benchmark("shelf_page")
+def shelf_page():
+    main_sections = shelf_globals()
+    shelf_window = pygame.Surface((700, 700))
+    main.draw_shelf_section(shelf_window, main_sections, 0, SHELF_COLUMNS, {})  # Warm the caches like a second visit
+
+    def run():
+        main.draw_shelf_section(shelf_window, main_sections, 0, SHELF_COLUMNS, {})
+    return run, 1
+
+@benchmark("shelf_page_cold")
+def shelf_page_cold():
+    main_sections = shelf_globals()
+    shelf_window = pygame.Surface((700, 700))
+
+    def run():
+        main.prize_cache = AssetCache()  # First visit, every prize image is decoded and scaled
+        main.draw_shelf_section(shelf_window, main_sections, 0, SHELF_COLUMNS, {})
+    return run, 1
+
+@benchmark("shelf_page_cached")
+def shelf_page_cached():
+    main_sections = shelf_globals()
+    shelf_pages = ShelfPages()
+    screen = pygame.Surface((700, 700))
+
+    def draw():
+        shelf_window = pygame.Surface((700, 700))
+        main.draw_shelf_section(shelf_window, main_sections, 0, SHELF_COLUMNS, {})
+        return shelf_window
+
+    def run():  # Moving back to a page already composited (or drawn in the background)
+        screen.blit(shelf_pages.get(0, main.prize_catalog.section_won[main_sections[0][0]], draw), (0, 0))
+    return run, 1
+
+# Builds a catalog with the given number of prizes, spread over sections and subsections like the real one
+def large_catalog(prize_count):
+    sections = {}
+    for index in range(prize_count):
+        section = sections.setdefault("Section %d" % (index // 500), {})
+        subsection = section.setdefault("Subsection %d" % (index // 50 % 10), {})
+        subsection[str(index % 50 + 1)] = "images/prizes/section%d/prize%d.png" % (index // 500, index)
+    return sections
+
+# Save data with every third prize of the catalog won
+def large_save_data(prize_count):
+    save_data = SaveData(datetime(2024, 1, 1), 100, 50)
+    for prize_id in range(0, prize_count, 3):
+        save_data.set_won(prize_id)
+    return save_data
+
+@benchmark("save_game_data")
+def save_large():
+    folder = temp_folder()
+    filename = os.path.join(folder, "save-file.sav")
+    save_data = large_save_data(LARGE_SAVE_PRIZES)
+
+    def run():
+        save_game_data(save_data, filename)
+    return run, 1
+
+@benchmark("load_save_file")
+def load_large():
+    folder = temp_folder()
+    filename = os.path.join(folder, "save-file.sav")
+    save_game_data(large_save_data(LARGE_SAVE_PRIZES), filename)
+    save_journal = SaveJournal(filename, read_only=True, catalog_sections=large_catalog(LARGE_SAVE_PRIZES))
+
+    def run():
+        save_journal.load()
+    return run, 1
+
+# First launch after the format change: the old JSON save (image path and won flag per prize) is read and converted
+@benchmark("migrate_legacy_save")
+def migrate_large():
+    folder = temp_folder()
+    catalog_sections = large_catalog(LARGE_SAVE_PRIZES)
+    game_data = {"Last Saved DateTime": "2024-01-01T00:00:00", "Coins": 100, "Gacha Balls": 50, "Prizes": {}}
+    for prize_id, (section, subsection, key) in enumerate(prize_ids(catalog_sections)):
+        prizes = game_data["Prizes"].setdefault(section, {}).setdefault(subsection, {})
+        prizes[key] = {"image": catalog_sections[section][subsection][key], "won": prize_id % 3 == 0}
+    with open(os.path.join(folder, "save-file.json"), 'w') as file:
+        json.dump(game_data, file, indent=4)
+    save_journal = SaveJournal(os.path.join(folder, "save-file.sav"), read_only=True, catalog_sections=catalog_sections)
+
+    def run():
+        save_journal.load()
+    return run, 1
+
+# Times the benchmark, then runs it once more under tracemalloc for its allocations
+def measure(setup, repeats):
+    run, calls = setup()
+    run()  # Warm up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000 / calls)
+
+    tracemalloc.start()
+    run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "calls": calls,
+        "peak_kib": peak / 1024,
+        "retained_kib": current / 1024,
+    }
+
+# Lists the figures that got worse than the baseline allows
+def regressions(results, baseline, threshold):
+    found = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        limit_ms = max(expected["median_ms"], MIN_BASELINE_MS) * threshold
+        if result["median_ms"] > limit_ms:
+            found.append("%s: %.3f ms per call, baseline %.3f ms" % (name, result["median_ms"], expected["median_ms"]))
+        limit_kib = max(expected["peak_kib"], MIN_BASELINE_KIB) * threshold
+        if result["peak_kib"] > limit_kib:
+            found.append("%s: %.1f KiB peak, baseline %.1f KiB" % (name, result["peak_kib"], expected["peak_kib"]))
+    return found
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "pymunk": pymunk.version,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmarks the physics, grab, asset and save hot paths.")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (all by default)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown factor over the baseline")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed runs per benchmark")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # Images and the save file are found relative to the game
+    pygame.init()
+    pygame.display.set_mode((1, 1))  # convert_alpha needs a display, even a dummy one
+
+    results = {}
+    print("%-26s %10s %10s %10s" % ("benchmark", "median ms", "min ms", "peak KiB"))
+    try:
+        for name, setup in benchmarks:
+            if args.names and name not in args.names:
+                continue
+            results[name] = measure(setup, args.repeats)
+            print("%-26s %10.3f %10.3f %10.1f" % (name, results[name]["median_ms"], results[name]["min_ms"], results[name]["peak_kib"]))
+    finally:
+        for folder in temp_folders:
+            folder.cleanup()
+        pygame.quit()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=4)
+
+    if args.update_baseline:
+        baseline = {"environment": environment(), "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as file:
+                baseline = json.load(file)
+        baseline["environment"] = environment()
+        baseline["results"].update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=4)
+        print("Baseline written to %s" % args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline at %s, run with --update-baseline first" % args.baseline)
+        return 0
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+    found = regressions(results, baseline["results"], args.threshold)
+    for line in found:
+        print("REGRESSION " + line)
+    if not found:
+        print("No regressions (threshold %.2fx)" % args.threshold)
+    return 1 if found else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
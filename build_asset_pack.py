@@ -0,0 +1,85 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import json
+import argparse
+import pygame
+
+from asset_pack import ASSET_PACK_FILE, MAGIC, HEADER, ALIGNMENT, image_key
+from asset_cache import fit_size
+from main import BALL_SIZE, LOGO_SIZE, SHELF_PRIZE_BOX, POPUP_PRIZE_BOX
+
+# Builds the asset pack: every image under images/ pre-scaled to the sizes the game draws it at
+#   python build_asset_pack.py
+
+# Sizes the game uses for an image (None keeps the original size)
+def game_sizes(path, native_size):
+    if path == "images/gacha.png":
+        return [BALL_SIZE]
+    if path == "images/logo.png":
+        return [LOGO_SIZE]
+    if path.startswith("images/prizes/"):
+        return [fit_size(native_size, SHELF_PRIZE_BOX), fit_size(native_size, POPUP_PRIZE_BOX)]
+    return [None]
+
+def find_images(folder):
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith(".png"):
+                paths.append(os.path.join(root, name).replace(os.sep, "/"))
+    return sorted(paths)
+
+def build(folder="images", filename=ASSET_PACK_FILE):
+    pygame.init()
+    pygame.display.set_mode((1, 1))  # Needed for convert_alpha, so the pixels match what the game loads
+
+    blobs = []  # (key, width, height, RGBA bytes)
+    native_sizes = {}
+    sources = {}
+    for path in find_images(folder):
+        image = pygame.image.load(path).convert_alpha()
+        native_sizes[path] = image.get_size()
+        stat = os.stat(path)
+        sources[path] = [stat.st_mtime_ns, stat.st_size]
+        for size in game_sizes(path, image.get_size()):
+            scaled = image if size is None or size == image.get_size() else pygame.transform.scale(image, size)
+            width, height = scaled.get_size()
+            blobs.append((image_key(path, (width, height)), width, height, pygame.image.tobytes(scaled, "RGBA")))
+
+    # Lay the pixel data out after the index, each image aligned
+    def align(offset):
+        return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+    index = {"images": {}, "native_sizes": native_sizes, "sources": sources}
+    while True:
+        index_bytes = json.dumps(index).encode()
+        offset = align(HEADER.size + len(index_bytes))
+        images = {}
+        for key, width, height, pixels in blobs:
+            images[key] = [offset, width, height]
+            offset = align(offset + len(pixels))
+        if images == index["images"]:
+            break
+        index["images"] = images  # Offsets depend on the index size, repeat until they settle
+
+    temp_file = filename + ".tmp"
+    with open(temp_file, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(index_bytes)))
+        file.write(index_bytes)
+        for key, width, height, pixels in blobs:
+            file.seek(images[key][0])
+            file.write(pixels)
+    os.replace(temp_file, filename)
+    return len(blobs), os.path.getsize(filename)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-scale the game images into a memory-mappable asset pack.")
+    parser.add_argument("--images", default="images", help="folder with the game images")
+    parser.add_argument("--output", default=ASSET_PACK_FILE, help="pack file to write")
+    args = parser.parse_args()
+    count, size = build(args.images, args.output)
+    print("Packed %d images into %s (%.1f MB)" % (count, args.output, size / 1024 / 1024))
+
+if __name__ == "__main__":
+    main()
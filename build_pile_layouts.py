@@ -0,0 +1,78 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import json
+import random
+import argparse
+import multiprocessing
+
+from main import PHYSICS_RATE, PHYSICS_SUBSTEPS
+from cabinet import Cabinet, create_space
+from gacha_ball import GachaBall
+from ball_store import BallStore
+from pile_layouts import PILE_LAYOUTS_FILE
+from timestep import FixedTimestep
+
+# Builds the library of settled piles: balls dropped at the game's spawn rate, simulated headless until they rest
+#   python build_pile_layouts.py --variants 4
+
+SPAWN_INTERVAL = 0.5  # Seconds between spawned balls, like the spawn_event timer
+MAX_SETTLE_TIME = 60.0  # Seconds to wait for the pile to come to rest before taking it as it is
+DROP_X_RANGE = (50, 650)  # Balls are dropped anywhere across the floor (dropped from the game's spawn point, x 29 or 30,
+                          # the small piles of every variant came out the same)
+
+# Drops the balls one by one and steps until they stop moving, returns their states and whether they came to rest
+def settle_pile(task):
+    ball_count, seed = task
+    random.seed(seed)
+    space = create_space()
+    timestep = FixedTimestep(PHYSICS_RATE, PHYSICS_SUBSTEPS)
+    gacha_prizes = BallStore()
+
+    for _ in range(ball_count):
+        gacha_prizes.append(GachaBall(space, (random.uniform(*DROP_X_RANGE), GachaBall.SPAWN_Y)))
+        for _ in range(int(round(SPAWN_INTERVAL / timestep.dt))):
+            timestep.step_space(space)
+
+    # A ball pinned against a wall can keep spinning on the spot and never fall asleep, so only movement counts
+    still_time = 0.0  # Seconds every ball has stayed slower than the idle speed
+    for _ in range(int(round(MAX_SETTLE_TIME / timestep.dt))):
+        if gacha_prizes.all_sleeping() or still_time >= space.sleep_time_threshold:
+            return [(x, y, angle, 0.0, 0.0, 0.0, 1) for x, y, angle, *_ in (gacha_ball.state() for gacha_ball in gacha_prizes)], True
+        timestep.step_space(space)
+        if all(gacha_ball.body.velocity.length < space.idle_speed_threshold for gacha_ball in gacha_prizes):
+            still_time += timestep.dt
+        else:
+            still_time = 0.0
+
+    # A few balls can roll back and forth on the flat floor for good, the game never gets them to rest either
+    return [gacha_ball.state() for gacha_ball in gacha_prizes], False
+
+def build(variants, seed, workers, filename=PILE_LAYOUTS_FILE):
+    tasks = [(ball_count, seed + ball_count * variants + variant)
+             for ball_count in range(1, Cabinet.DAILY_BALLS + 1) for variant in range(variants)]
+    with multiprocessing.Pool(workers) as pool:
+        piles = pool.map(settle_pile, tasks, chunksize=1)
+
+    layouts = {}
+    for (ball_count, _), (pile, _) in zip(tasks, piles):
+        layouts.setdefault(str(ball_count), []).append(pile)
+    library = {"physics_rate": PHYSICS_RATE, "substeps": PHYSICS_SUBSTEPS, "seed": seed, "layouts": layouts}
+
+    temp_file = filename + ".tmp"
+    with open(temp_file, 'w') as file:
+        json.dump(library, file)
+    os.replace(temp_file, filename)
+    return sum(settled for _, settled in piles), len(tasks)
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate settled ball piles for the start of a fresh day.")
+    parser.add_argument("--variants", type=int, default=4, help="layouts per ball count")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first simulation")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--output", default=PILE_LAYOUTS_FILE, help="library file to write")
+    args = parser.parse_args()
+    settled, total = build(args.variants, args.seed, args.workers, args.output)
+    print("Wrote %d piles to %s, %d of them at rest" % (total, args.output, settled))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import time
+from datetime import datetime
+import pymunk
+
+from claw import Claw
+from gacha_ball import GachaBall
+from ball_store import BallStore
+from prize_catalog import PrizeCatalog
+from pile_layouts import pick_layout
+from physics_governor import PRESETS, PRESET_NAMES, DEFAULT_PRESET, apply_preset
+from save_format import SaveData
+
+# Collision category bit of the container walls
+WALL_CATEGORY = 0b100
+
+# Command codes for a cabinet, with a value each: LEFT and RIGHT take whether the button is held, the others ignore it
+# (the host sends them to its workers, the game loop to its physics thread)
+LEFT, RIGHT, DROP, SHUFFLE, COIN, SPAWN = range(6)
+
+# Creates the container where the gacha balls will be contained
+def create_container(space):
+    container_width = 770
+    container_height = 450
+    center_x = 350
+    center_y = 340
+
+    half_width = container_width // 2
+    half_height = container_height // 2
+
+    # Define the corner points of the box
+    top_left = (center_x - half_width, center_y - half_height)
+    top_right = (center_x + half_width, center_y - half_height)
+    bottom_left = (center_x - half_width, center_y + half_height)
+    bottom_right = (center_x + half_width, center_y + half_height)
+
+    # Define static lines forming the box
+    static_lines = [
+        pymunk.Segment(space.static_body, top_left, top_right, 50),  # Top
+        pymunk.Segment(space.static_body, top_right, bottom_right, 50),  # Right
+        pymunk.Segment(space.static_body, bottom_right, bottom_left, 50),  # Bottom
+        pymunk.Segment(space.static_body, bottom_left, top_left, 50),  # Left
+    ]
+
+    # Set elasticity and add lines to the space
+    for line in static_lines:
+        line.elasticity = 0.6 # Allows the gacha balls to partially bounce off the container
+        line.filter = pymunk.ShapeFilter(categories=WALL_CATEGORY)
+        space.add(line)
+
+# Creates the physics space of the machine, with its container
+def create_space():
+    space = pymunk.Space()
+    space.gravity = (0, 900)
+    # Solver, spatial hash and sleep thresholds of the default physics preset (settled balls sleep and cost nothing to step)
+    apply_preset(space, None, PRESETS[PRESET_NAMES.index(DEFAULT_PRESET)])
+    create_container(space)
+    return space
+
+# One claw machine: its physics space, claw, balls, coins and save file
+class Cabinet:
+    # Constants declaration
+    DAILY_BALLS = 20  # Balls handed out per day
+    MAX_COINS = 20
+    OFFLINE_COIN_SECONDS = 300  # Seconds per coin earned while the game was closed
+    CLAW_MARGIN = 100  # The claw stays this far from the sides of the machine
+
+    def __init__(self, screen_width, claw_pieces, save_journal, save_data, catalog_sections, timestep, rng=None, layouts=None):
+        self.screen_width = screen_width
+        self.space = create_space()
+        self.claw = Claw(screen_width, self.space, *claw_pieces)
+        self.gacha_prizes = BallStore(rng=rng)  # Stores the gacha balls (with their positions and angles as arrays)
+        self.save_journal = save_journal
+        self.save_data = save_data
+        self.prize_catalog = PrizeCatalog(catalog_sections, save_data.won)  # Flat index of the prizes, marks the save's won bits
+        self.timestep = timestep
+        self.layouts = layouts or {}  # Settled piles by ball count (see pile_layouts.py), empty to spawn balls one by one
+        self.quality = PRESET_NAMES.index(DEFAULT_PRESET)  # Physics quality preset in use (see physics_governor.py)
+        self.physics_time = 0.0  # Seconds spent stepping the space since the governor last took it
+        self.claw_time = 0.0  # Seconds spent running the claw since the physics thread last took it
+        self.spawned = 0  # Balls spawned today
+        self.coins = 0
+        self.left_pressed = False
+        self.right_pressed = False
+
+    # Restores the balls left for today and adds the coins earned while the game was closed
+    def start(self, now):
+        last_saved = self.save_data.saved_at
+        pile = self.save_data.pile
+        if now.date() != last_saved.date():
+            self.spawned = 0  # Gacha balls returns to 20 after the next day
+            pile = []
+        else:
+            self.spawned = self.DAILY_BALLS - self.save_data.balls
+        self.coins = self.save_data.coins
+        self.coins += int(abs((now - last_saved).total_seconds()) / self.OFFLINE_COIN_SECONDS)
+        self.coins = min(self.coins, self.MAX_COINS)
+
+        # Put the balls back where they were when the game closed, otherwise start from a settled pile of the library
+        if not pile or len(pile) > self.DAILY_BALLS - self.spawned:
+            pile = pick_layout(self.layouts, self.DAILY_BALLS - self.spawned, self.gacha_prizes.rng) or []
+        for state in pile:
+            self.gacha_prizes.append(GachaBall.restore(self.space, state))
+        self.spawned += len(pile)
+
+        # Journal the day's refill and the offline coins, a crash before the next checkpoint would lose them otherwise
+        self.save_journal.record("day_started", coins=self.coins, balls=self.balls_left())
+
+    # Balls in the machine plus the ones still to spawn today
+    def balls_left(self):
+        return len(self.gacha_prizes) + (self.DAILY_BALLS - self.spawned)
+
+    # Adds the next ball of the day, returns False once all of them are out
+    def spawn(self):
+        if self.spawned < self.DAILY_BALLS:
+            self.gacha_prizes.append(GachaBall(self.space))
+            self.spawned += 1
+        return self.spawned < self.DAILY_BALLS
+
+    def shuffle(self):
+        self.gacha_prizes.shuffle()
+
+    # Moves the claw by one step's worth, staying within bounds (callers only do this while it is idle)
+    def nudge(self, direction):
+        if direction < 0:
+            self.claw.x = max(self.CLAW_MARGIN, self.claw.x - self.claw.SPEED * self.timestep.dt)
+        else:
+            self.claw.x = min(self.screen_width - self.CLAW_MARGIN, self.claw.x + self.claw.SPEED * self.timestep.dt)
+
+    # Spends a coin and sends the claw down (returns False if it is busy or there are no coins)
+    def drop(self):
+        if self.claw.state != "idle" or self.coins <= 0:
+            return False
+        self.claw.state = "descending"
+        self.coins -= 1
+        self.save_journal.record("coin_spent", coins=self.coins)
+        return True
+
+    def earn_coin(self):
+        self.coins += 1
+        self.save_journal.record("coin_earned", coins=self.coins)
+
+    # Applies one (code, value) command, the buttons only move the claw while it is idle
+    def apply(self, command):
+        code, value = command
+        if code == LEFT:
+            if value and self.claw.state == "idle":
+                self.nudge(-1)
+            self.left_pressed = value
+        elif code == RIGHT:
+            if value and self.claw.state == "idle":
+                self.nudge(1)
+            self.right_pressed = value
+        elif code == DROP:
+            self.drop()
+        elif code == SHUFFLE:
+            self.shuffle()
+        elif code == COIN:
+            self.earn_coin()
+        elif code == SPAWN:
+            self.spawn()
+
+    # Runs the claw for one fixed step, returns True when it brought a ball back up
+    def step_claw(self):
+        self.claw.save_previous_state()
+        self.gacha_prizes.save_previous_state()
+
+        # Move the claw while a button is held
+        if self.claw.state == "idle":
+            if self.left_pressed:
+                self.nudge(-1)
+            if self.right_pressed:
+                self.nudge(1)
+
+        # Handle claw descending and ascending
+        if self.claw.step(self.gacha_prizes, self.timestep.dt):
+            self.save_journal.record("ball_grabbed", balls=self.balls_left())
+            return True
+        return False
+
+    def step_physics(self):
+        start = time.perf_counter()
+        self.timestep.step_space(self.space)
+        self.gacha_prizes.sync()
+        self.physics_time += time.perf_counter() - start
+
+    # Switches the physics to another quality preset (by index)
+    def set_quality(self, level):
+        apply_preset(self.space, self.timestep, PRESETS[level])
+        self.quality = level
+
+    # Hands the physics time of this frame to the governor, returns the preset index it picks
+    def govern(self, governor):
+        if self.physics_time:
+            governor.frame(self.physics_time, len(self.gacha_prizes))
+            self.physics_time = 0.0
+        return governor.level
+
+    # Runs the fixed steps the frame time covers, returns the IDs of the prizes won on the way
+    def advance(self, frame_time):
+        prizes = []
+        for _ in range(self.timestep.advance(frame_time)):
+            start = time.perf_counter()
+            grabbed = self.step_claw()
+            self.claw_time += time.perf_counter() - start
+            if grabbed:
+                prize_id = self.award_prize()
+                if prize_id is not None:
+                    prizes.append(prize_id)
+            self.step_physics()
+        return prizes
+
+    # Picks a random prize that has not been won yet and marks it won, returns its ID (None once all are won)
+    def award_prize(self):
+        prize_id = self.prize_catalog.random_unwon()
+        if prize_id is None:
+            return None
+        self.prize_catalog.mark_won(prize_id)  # Sets its bit in the save data too
+        self.save_journal.record("prize_won", prize=prize_id)
+        return prize_id
+
+    # Every ball asleep and the claw idle with no button held
+    def resting(self):
+        return (self.claw.state == "idle" and not self.left_pressed and not self.right_pressed
+                and self.gacha_prizes.all_sleeping())
+
+    # Snapshot of the progress to save (the won bits are copied), with where every ball is
+    def game_data(self):
+        pile = [gacha_ball.state() for gacha_ball in self.gacha_prizes]
+        return SaveData(datetime.now(), self.coins, self.balls_left(), self.save_data.won, pile)
+
+    # Writes the final snapshot of the save file
+    def close(self):
+        self.save_journal.close(self.game_data())
@@ -1,28 +1,95 @@
 
+import time
 import pymunk
 import random
+from gacha_ball import GachaBall
+
+# Counts shapes added to and removed from the space, to check how much the claw churns the broadphase
+class ShapeOpCounter:
+    def __init__(self):
+        self.total = 0
+        self.window_ops = 0
+        self.window_start = time.perf_counter()
+        self.rate = 0.0
+
+    def record(self, count=1):
+        self.total += count
+        self.window_ops += count
+
+    # Returns the add/remove operations per second measured over the last full second
+    def per_second(self):
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.rate = self.window_ops / elapsed
+            self.window_ops = 0
+            self.window_start = now
+        return self.rate
+
 class Claw:
     ORIGINAL_Y = 210
     TARGET_Y = 450
-    SPEED = 5
+    SPEED = 300  # Pixels per second
     GRAB_RADIUS = 40
     GRAB_CHANCE = 1
+    CATEGORY = 0b010  # Collision category bit of the claw shapes
+    GRAB_FILTER = pymunk.ShapeFilter(categories=CATEGORY, mask=GachaBall.CATEGORY)  # Grab queries only see gacha balls
     
-    def __init__(self, screen_width, space):
+    def __init__(self, screen_width, space, claw_pieces_close_list, claw_pieces_open_list):
         # Initializes the claw properties
         self.x = screen_width // 2  # Initial claw X position
         self.body = pymunk.Body(body_type=pymunk.Body.KINEMATIC)  # Initialize pymunk body
         self.body.position = (self.x, self.ORIGINAL_Y)  # Initial claw position
+        self.previous_position = self.body.position  # Position before the last physics step
         self.state = "idle"
         self.space = space  # Pymunk space
         self.current_frame = 0  # Track current frame in animation
         self.frame_delay = 5  # Delay before switching to the next frame
         self.frame_counter = 0  # Counter to track frame delays
         self.grabbed_ball = None
-        self.shape = None
+        self.shapes = ()  # Shapes currently in the space
+        self.shape_ops = ShapeOpCounter()
+        self.space.add(self.body)
+
+        # Build the shapes of every animation frame up front, one per convex piece (frames sharing an outline share them)
+        pool = {}
+        self.frame_shapes = {
+            "close": [self.build_shapes(pieces, pool) for pieces in claw_pieces_close_list],
+            "open": [self.build_shapes(pieces, pool) for pieces in claw_pieces_open_list],
+        }
+
+    def build_shapes(self, claw_pieces, pool):
+        key = tuple(tuple(map(tuple, piece)) for piece in claw_pieces)
+        if key not in pool:
+            pool[key] = tuple(self.build_shape(piece) for piece in claw_pieces)
+        return pool[key]
+
+    def build_shape(self, claw_points):
+        shape = pymunk.Poly(self.body, claw_points)
+        shape.elasticity = 0.4
+        shape.friction = 0.5
+        shape.filter = pymunk.ShapeFilter(categories=self.CATEGORY)
+        return shape
     
-    def descend(self, gacha_prizes, claw_points_close_list):
-        self.body.position = (self.x, self.body.position.y + self.SPEED)
+    def save_previous_state(self): # Remembers the position before a physics step (used to interpolate drawing)
+        self.previous_position = self.body.position
+
+    def interpolated_position(self, alpha): # Position between the last two physics steps
+        return self.previous_position + (self.body.position - self.previous_position) * alpha
+
+    # Advances the claw by one physics step, returns True when it brought a ball back up
+    def step(self, gacha_prizes, dt):
+        # Update claw body position for physics
+        self.body.position = (self.x, self.body.position.y)
+
+        if self.state == "descending":
+            self.descend(gacha_prizes, dt)
+        elif self.state == "ascending":
+            return self.ascend(gacha_prizes, dt)
+        return False
+
+    def descend(self, gacha_prizes, dt):
+        self.body.position = (self.x, self.body.position.y + self.SPEED * dt)
         # Check if claw reached target
         if self.body.position.y >= self.TARGET_Y:
             self.grabbed_ball = self.check_grab(gacha_prizes)
@@ -31,12 +98,12 @@ class Claw:
             self.frame_counter += 1
             if self.frame_counter >= self.frame_delay: # Switch to next frame after delay
                 self.frame_counter = 0
-                self.current_frame = min(self.current_frame + 1, len(claw_points_close_list) - 1)
-        self.shape = self.update_claw_shape(claw_points_close_list) # Update claw shape based on current frame
+                self.current_frame = min(self.current_frame + 1, len(self.frame_shapes["close"]) - 1)
+        self.shapes = self.update_claw_shape("close") # Update claw shape based on current frame
     
-    def ascend(self, gacha_prizes, claw_points_open_list):
+    def ascend(self, gacha_prizes, dt):
         flag = False
-        self.body.position = (self.x, self.body.position.y - self.SPEED)
+        self.body.position = (self.x, self.body.position.y - self.SPEED * dt)
         if self.grabbed_ball:
             ball_body, _ = self.grabbed_ball.get_body_and_shape()
             ball_body.position = self.body.position + pymunk.Vec2d(0, 40)  # Offset below claw
@@ -48,43 +115,38 @@ class Claw:
             self.frame_counter = 1
             if self.frame_counter >= self.frame_delay:
                 self.frame_counter = 0
-                self.current_frame = min(self.current_frame + 1, len(claw_points_open_list) - 1)
+                self.current_frame = min(self.current_frame + 1, len(self.frame_shapes["open"]) - 1)
             if self.grabbed_ball:
                     flag = True
                     gacha_prizes.remove(self.grabbed_ball)
                     self.space.remove(self.grabbed_ball.body, self.grabbed_ball.shape)
                     self.grabbed_ball = None
-        self.shape = self.update_claw_shape(claw_points_open_list)
+        self.shapes = self.update_claw_shape("open")
         return flag
     
+    # Finds the gacha ball closest to the claw within the grab radius (measured between centers)
     def check_grab(self, gacha_prizes):
-        for gacha_ball in gacha_prizes:
-            claw_pos = self.shape.body.position
-            prize_pos = gacha_ball.body.position
-            distance = (claw_pos - prize_pos).length  # Vector distance
-            if distance <= self.GRAB_RADIUS:  # Check if within grab radius
-                if random.random() <= self.GRAB_CHANCE:  # Check grab chance
-                    return gacha_ball  # Return grabbed ball
+        claw_pos = self.body.position
+        # The query measures to the ball's surface, so shrink the radius by the ball radius
+        nearest = self.space.point_query_nearest(claw_pos, self.GRAB_RADIUS - GachaBall.RADIUS, self.GRAB_FILTER)
+        if nearest is None:
+            return None
+        gacha_ball = nearest.shape.gacha_ball
+        if random.random() <= self.GRAB_CHANCE:  # Check grab chance
+            return gacha_ball  # Return grabbed ball
         return None
     
-    # Update the claw shape based on the current animation frame
-    def update_claw_shape(self, claw_points_list):
-        # Remove the old shapes from the body and the space
-        for shape in self.body.shapes:
-            self.space.remove(shape)
-        
-        # Add the body to the space (if not already added)
-        if self.body not in self.space.bodies:
-            self.space.add(self.body)
-
-        # Create a new claw shape
-        new_claw_points = claw_points_list[self.current_frame]
-        self.shape = pymunk.Poly(self.body, new_claw_points)
-        self.shape.elasticity = 0.4
-        self.shape.friction = 0.5
-
-        # Add the new shape to the space
-        self.space.add(self.shape)
+    # Update the claw shape based on the current animation frame ("close" or "open")
+    def update_claw_shape(self, animation):
+        new_shapes = self.frame_shapes[animation][self.current_frame]
 
-        return self.shape
+        # Swap the prebuilt shapes only when the frame actually changes
+        if new_shapes is not self.shapes:
+            if self.shapes:
+                self.space.remove(*self.shapes)
+                self.shape_ops.record(len(self.shapes))
+            self.space.add(*new_shapes)
+            self.shape_ops.record(len(new_shapes))
+            self.shapes = new_shapes
 
+        return self.shapes
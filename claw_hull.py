@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pygame
+
+# Where the claw outlines are remembered between launches
+HULL_CACHE_FILE = os.path.join(".cache", "claw-shapes.json")
+OUTLINE_TOLERANCE = 3  # Pixels the traced outline may stray from the sprite's edge when simplified
+PIECE_TOLERANCE = 8  # Concavity (in pixels) a convex piece may leave out, higher gives fewer pieces
+CLAW_IMAGES = ["images/claw%d.png" % i for i in (1, 2, 3)]  # Frames of the closing claw animation
+
+# Computes the convex hull of a list of (x, y) points (monotone chain, collinear points dropped)
+def convex_hull(points):
+    points = sorted(set(points))
+    if len(points) <= 2:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    upper = []
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+# Doubled signed area of a polygon, positive when the points go clockwise on screen
+def doubled_area(points):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]))
+
+# Drops the vertices that add the least area until at most max_vertices are left (a convex polygon stays convex)
+def simplify_polygon(points, max_vertices):
+    points = list(points)
+    while max_vertices and len(points) > max(max_vertices, 3):
+        def lost_area(index):
+            return abs(doubled_area([points[index - 1], points[index], points[(index + 1) % len(points)]]))
+        del points[min(range(len(points)), key=lost_area)]
+    return points
+
+# Center of the visible pixels' bounding box, the claw's shapes are placed around it
+def visible_center(visible):
+    columns = np.flatnonzero(visible.any(axis=1))
+    rows = np.flatnonzero(visible.any(axis=0))
+    return int(columns[0] + columns[-1]) // 2, int(rows[0] + rows[-1]) // 2
+
+# Reads the outline of the visible pixels straight from the surface's alpha plane
+def hull_from_alpha(surface):
+    visible = pygame.surfarray.array_alpha(surface) > 0  # Indexed [x, y]
+    rows = np.flatnonzero(visible.any(axis=0))
+    width = visible.shape[0]
+
+    # Only the leftmost and rightmost visible pixel of each row can be on the hull
+    left = visible[:, rows].argmax(axis=0)
+    right = width - 1 - visible[::-1, rows].argmax(axis=0)
+    edge_points = list(zip(left.tolist(), rows.tolist())) + list(zip(right.tolist(), rows.tolist()))
+    hull_points = convex_hull(edge_points)
+
+    # Center the points on the middle of the claw
+    xs = [x for x, _ in hull_points]
+    ys = [y for _, y in hull_points]
+    center_x = (max(xs) + min(xs)) // 2
+    center_y = (max(ys) + min(ys)) // 2
+    return [(x - center_x, y - center_y) for x, y in hull_points]
+
+# Splits the real (concave) outline of the visible pixels into convex pieces, keeping the gap between the prongs open
+def pieces_from_alpha(surface, max_vertices=None):
+    import pymunk
+    from pymunk import autogeometry
+
+    visible = pygame.surfarray.array_alpha(surface) > 0  # Indexed [x, y]
+    width, height = visible.shape
+    padded = np.zeros((width + 2, height + 2), dtype=bool)  # A clear border so every outline closes
+    padded[1:-1, 1:-1] = visible
+
+    def sample(point):
+        return 1.0 if padded[int(round(point[0])), int(round(point[1]))] else 0.0
+
+    outlines = autogeometry.march_hard(pymunk.BB(0, 0, width + 1, height + 1), width + 2, height + 2, 0.5, sample)
+
+    # The largest outline is the claw, the rest are holes and stray pixels
+    outline = max((autogeometry.simplify_curves(line, OUTLINE_TOLERANCE) for line in outlines),
+                  key=lambda line: abs(doubled_area([tuple(p) for p in line])))
+    outline = [tuple(p) for p in outline]
+    if doubled_area(outline) < 0:
+        outline.reverse()  # The decomposition wants clockwise points
+
+    center_x, center_y = visible_center(visible)
+    pieces = []
+    for piece in autogeometry.convex_decomposition(outline, PIECE_TOLERANCE):
+        points = [(x - 1 - center_x, y - 1 - center_y) for x, y in piece[:-1]]  # Back from the padded grid, last point repeats the first
+        pieces.append(simplify_polygon(points, max_vertices))
+    return pieces
+
+# Convex pieces of the claw's collision shape: its hull alone, or its real outline split up
+def claw_pieces(surface, max_vertices=None, concave=False):
+    if concave:
+        return pieces_from_alpha(surface, max_vertices)
+    return [simplify_polygon(hull_from_alpha(surface), max_vertices)]
+
+class HullCache:
+    def __init__(self, filename=HULL_CACHE_FILE):
+        self.filename = filename
+        self.hulls = {}  # Image content hash and shape settings -> centered convex pieces
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, 'r') as file:
+                self.hulls = {key: [[tuple(p) for p in piece] for piece in pieces] for key, pieces in json.load(file).items()}
+        except (OSError, ValueError):
+            self.hulls = {}  # Missing or unreadable cache, the outlines will be recomputed
+
+    # Writes the cache back to disk if anything new was computed
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        temp_file = self.filename + ".tmp"
+        with open(temp_file, 'w') as file:
+            json.dump(self.hulls, file)
+        os.replace(temp_file, self.filename)
+        self.dirty = False
+
+    @staticmethod
+    def image_key(surface):
+        width, height = surface.get_size()
+        digest = hashlib.sha1(pygame.image.tobytes(surface, "RGBA"))
+        return "%dx%d-%s" % (width, height, digest.hexdigest())
+
+    # Returns the claw's convex pieces for the surface, computing them only the first time this image and setting are seen
+    def get_claw_pieces(self, surface, max_vertices=None, concave=False, scale=1.0):
+        key = "%s-%s-%s" % (self.image_key(surface), "concave" if concave else "hull", max_vertices or "all")
+        pieces = self.hulls.get(key)
+        if pieces is None:
+            pieces = self.hulls[key] = claw_pieces(surface, max_vertices, concave)
+            self.dirty = True
+        return [[(x * scale, y * scale) for x, y in piece] for piece in pieces]
+
+    # Returns the full claw outline for the surface
+    def get_claw_points(self, surface, scale=1.0):
+        return self.get_claw_pieces(surface, scale=scale)[0]
+
+# Gets the points around the shape of the claw animation (ensures the game recognizes the different claw shapes)
+def get_claw_points_from_surface(surface, scale=1.0, cache=None):
+    if cache is None:
+        return [(x * scale, y * scale) for x, y in hull_from_alpha(surface)]
+    return cache.get_claw_points(surface, scale)
+
+# Gets the convex pieces the claw collides with, at most max_vertices points each (None keeps every point)
+def get_claw_pieces_from_surface(surface, max_vertices=None, concave=False, scale=1.0, cache=None):
+    if cache is None:
+        return [[(x * scale, y * scale) for x, y in piece] for piece in claw_pieces(surface, max_vertices, concave)]
+    return cache.get_claw_pieces(surface, max_vertices, concave, scale)
+
+# Loads the claw's convex pieces without a display, using the on-disk hull cache
+# Returns the lists for the closing animation and the opening one (the closing frames in reverse)
+def load_claw_pieces(max_vertices=None, concave=False):
+    hull_cache = HullCache()
+    images = [pygame.image.load(path) for path in CLAW_IMAGES]
+    claw_pieces_close_list = [get_claw_pieces_from_surface(image, max_vertices, concave, cache=hull_cache) for image in images]
+    hull_cache.save()
+    return claw_pieces_close_list, claw_pieces_close_list[::-1]
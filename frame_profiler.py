@@ -0,0 +1,110 @@
+import json
+import time
+import numpy as np
+import pygame
+
+class FrameProfiler:
+    # Constants declaration
+    # "physics" is the wait for the physics thread, "claw" and "step" the time the thread spent running the claw and
+    # stepping the space (they run alongside the other phases, so they aren't part of the frame's own time)
+    PHASES = ("events", "physics", "claw", "step", "sprites", "hud", "present")
+    EVENTS, PHYSICS, CLAW, STEP, SPRITES, HUD, PRESENT = range(len(PHASES))  # Phase indices for mark() and add()
+    DEFAULT_CAPACITY = 1200  # Frames kept in the ring buffer (20 seconds at 60 FPS)
+    OVERLAY_REFRESH = 30  # Frames between overlay redraws
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=False):
+        self.enabled = enabled
+        self.recording = False  # Timing the current frame (only frames begun while enabled are recorded)
+        self.show_overlay = False
+        self.timings = np.zeros((capacity, len(self.PHASES)))  # Ring buffer of seconds per phase, one row per frame
+        self.frames = 0  # Frames recorded so far (the newest row is (frames - 1) % capacity)
+        self.row = [0.0] * len(self.PHASES)
+        self.last_mark = 0.0
+        self.overlay = None
+
+    # Starts timing a frame (does nothing while disabled, the other calls do nothing until a frame begins enabled)
+    def begin_frame(self):
+        self.recording = self.enabled
+        if not self.recording:
+            return
+        for phase in range(len(self.row)):
+            self.row[phase] = 0.0
+        self.last_mark = time.perf_counter()
+
+    # Adds the time since the previous mark to the phase (phases can be marked several times a frame)
+    def mark(self, phase):
+        if not self.recording:
+            return
+        now = time.perf_counter()
+        self.row[phase] += now - self.last_mark
+        self.last_mark = now
+
+    # Adds time measured elsewhere (like on the physics thread) to the phase
+    def add(self, phase, seconds):
+        if self.recording:
+            self.row[phase] += seconds
+
+    # Skips time that belongs to no phase (like waiting for the next frame)
+    def skip(self):
+        if self.recording:
+            self.last_mark = time.perf_counter()
+
+    def end_frame(self):
+        if not self.recording:
+            return
+        self.timings[self.frames % len(self.timings)] = self.row
+        self.frames += 1
+
+    # Turning the overlay on mid-frame starts recording with the next frame
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.overlay = None
+        if self.show_overlay:
+            self.enabled = True
+
+    # Timings of the recorded frames, oldest first
+    def recorded(self):
+        capacity = len(self.timings)
+        if self.frames <= capacity:
+            return self.timings[:self.frames]
+        start = self.frames % capacity
+        return np.concatenate((self.timings[start:], self.timings[:start]))
+
+    # Returns {phase: (p50, p95, p99)} in milliseconds
+    def percentiles(self):
+        recorded = self.recorded()
+        if not len(recorded):
+            return {}
+        values = np.percentile(recorded, (50, 95, 99), axis=0) * 1000
+        return {phase: tuple(values[:, index]) for index, phase in enumerate(self.PHASES)}
+
+    # Returns the overlay image, redrawn every OVERLAY_REFRESH frames (notes are extra lines shown under the phases)
+    def overlay_surface(self, font, notes=()):
+        if self.overlay is not None and self.frames % self.OVERLAY_REFRESH:
+            return self.overlay
+        lines = ["phase      p50    p95    p99 ms"]
+        for phase, (p50, p95, p99) in self.percentiles().items():
+            lines.append("%-8s %6.2f %6.2f %6.2f" % (phase, p50, p95, p99))
+        lines.extend(notes)
+        labels = [font.render(line, True, (255, 255, 255)) for line in lines]
+        line_height = font.get_linesize()
+        self.overlay = pygame.Surface((max(label.get_width() for label in labels) + 10, line_height * len(labels) + 10), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 170))
+        for index, label in enumerate(labels):
+            self.overlay.blit(label, (5, 5 + index * line_height))
+        return self.overlay
+
+    # Writes the recorded frames as CSV, or as JSON lines if the file name ends in .jsonl
+    def dump(self, filename):
+        recorded = self.recorded() * 1000
+        first_frame = self.frames - len(recorded)
+        with open(filename, 'w') as file:
+            if filename.endswith(".jsonl"):
+                for offset, row in enumerate(recorded.tolist()):
+                    entry = {"frame": first_frame + offset}
+                    entry.update(zip(self.PHASES, row))
+                    file.write(json.dumps(entry) + "\n")
+            else:
+                file.write(",".join(("frame",) + self.PHASES) + "\n")
+                for offset, row in enumerate(recorded.tolist()):
+                    file.write("%d,%s\n" % (first_frame + offset, ",".join("%.4f" % value for value in row)))
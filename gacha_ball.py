@@ -1,6 +1,8 @@
 import pymunk
 import random
 class GachaBall:
+    __slots__ = ("space", "body", "shape")
+
     # Constants declaration
     SPAWN_X_RANGE = (29, 30)
     SPAWN_Y = 150
@@ -9,13 +11,15 @@ class GachaBall:
     ELASTICITY = 0.8
     FRICTION = 0.5
     COLLISION_TYPE = 1
+    CATEGORY = 0b001  # Collision category bit, lets queries pick out only gacha balls
 
-    def __init__(self, space):
+    def __init__(self, space, position=None):
         self.space = space
 
-        # Use constants for initialization
-        spawn_x = random.randint(*self.SPAWN_X_RANGE)
-        spawn_y = self.SPAWN_Y
+        # Use constants for initialization (balls put back from a saved pile give their own position)
+        if position is None:
+            position = random.randint(*self.SPAWN_X_RANGE), self.SPAWN_Y
+        spawn_x, spawn_y = position
 
         # Create the body and shape
         self.body = pymunk.Body(self.MASS, pymunk.moment_for_circle(self.MASS, 0, self.RADIUS))
@@ -24,17 +28,30 @@ class GachaBall:
         self.shape.elasticity = self.ELASTICITY
         self.shape.friction = self.FRICTION
         self.shape.collision_type = self.COLLISION_TYPE
+        self.shape.filter = pymunk.ShapeFilter(categories=self.CATEGORY)
+        self.shape.gacha_ball = self  # Lets space queries map the shape back to its ball
 
         # Add the body and shape to the space
         self.space.add(self.body, self.shape)
 
     def get_body_and_shape(self): # Returns the pymunk body and shape of the gacha ball
         return self.body, self.shape
-    
-    def shuffle(self, intensity=500): # Apply random forces to shuffle the gacha ball
-        # Generate random force components
-        force_x = random.uniform(-intensity, intensity)
-        force_y = random.uniform(-intensity, intensity)
-        
-        # Apply the impulse to the ball's body
-        self.body.apply_impulse_at_local_point((force_x, force_y))
+
+    # What is saved of the ball: (x, y, angle, velocity x, velocity y, angular velocity, asleep)
+    def state(self):
+        body = self.body
+        x, y = body.position
+        velocity_x, velocity_y = body.velocity
+        return (x, y, body.angle, velocity_x, velocity_y, body.angular_velocity, int(body.is_sleeping))
+
+    # Adds a ball to the space with a saved state, asleep again if it was
+    @classmethod
+    def restore(cls, space, state):
+        x, y, angle, velocity_x, velocity_y, angular_velocity, asleep = state
+        gacha_ball = cls(space, (x, y))
+        gacha_ball.body.angle = angle
+        gacha_ball.body.velocity = velocity_x, velocity_y
+        gacha_ball.body.angular_velocity = angular_velocity
+        if asleep:
+            gacha_ball.body.sleep()
+        return gacha_ball
@@ -0,0 +1,289 @@
+import os
+import math
+import time
+import random
+import argparse
+import multiprocessing
+from datetime import datetime
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import pygame
+
+from main import (SCREEN_WIDTH, SCREEN_HEIGHT, FPS, PHYSICS_RATE, PHYSICS_SUBSTEPS, MAX_STEPS_PER_FRAME, BALL_SIZE,
+                  LOGO_SIZE, POPUP_PRIZE_BOX, ROTATION_STEP, SAVE_CHECKPOINT_EVENTS, SAVE_CHECKPOINT_SECONDS, PHYSICS_PRESET,
+                  PHYSICS_BUDGET_MS, CLAW_MAX_VERTICES, CLAW_CONCAVE)
+from cabinet import Cabinet, LEFT, RIGHT, DROP, SHUFFLE, COIN
+from physics_governor import PhysicsGovernor
+from claw_hull import load_claw_pieces
+from timestep import FixedTimestep
+from save_journal import SaveJournal, save_game_data
+from save_format import SaveData
+from prize_catalog import load_catalog
+from pile_layouts import load_layouts
+from transform_buffer import TransformBuffer
+from asset_pack import AssetPack, ASSET_PACK_FILE, load_image
+from asset_cache import AssetCache
+from sprite_cache import RotationCache
+from text_cache import TextCache
+
+# Host mode: drives a wall of cabinets from one process, stepping them in parallel worker processes
+#   python host.py --cabinets 8
+#   python host.py --cabinets 8 --autoplay --headless --unthrottled --frames 600   (measures throughput)
+
+SAVE_FOLDER = "saves"  # One save file per cabinet
+SPAWN_INTERVAL = 0.5  # Seconds between spawned balls, like the spawn_event timer of the single cabinet game
+COIN_INTERVAL = 60  # Seconds of play per earned coin
+AUTOPLAY_CHANCE = 1 / 120  # Chance per frame that an idle autoplaying cabinet plays (about every 2 seconds)
+PRIZE_BANNER_SECONDS = 2  # How long a won prize is shown on its cabinet
+CABINET_SIZE = 350  # Size each cabinet is drawn at in the host window
+
+# Loads a cabinet's save file (migrating an old JSON one), starting a fresh one with every prize locked the first time
+def load_save(index, folder, catalog_sections):
+    filename = os.path.join(folder, "cabinet-%d.sav" % (index + 1))
+    save_journal = SaveJournal(filename, SAVE_CHECKPOINT_EVENTS, SAVE_CHECKPOINT_SECONDS, catalog_sections=catalog_sections)
+    if not os.path.exists(filename) and not os.path.exists(save_journal.legacy_filename):
+        os.makedirs(folder, exist_ok=True)
+        save_game_data(SaveData(datetime.now(), Cabinet.MAX_COINS, Cabinet.DAILY_BALLS), filename)
+    game_data = save_journal.load()
+    save_journal.start(game_data)
+    return save_journal, game_data
+
+# Plays an idle cabinet now and then: a drop at a random spot, or a shuffle once the coins run out
+def autoplay(cabinet, rng):
+    if cabinet.claw.state != "idle" or rng.random() >= AUTOPLAY_CHANCE:
+        return
+    cabinet.claw.x = rng.uniform(Cabinet.CLAW_MARGIN, cabinet.screen_width - Cabinet.CLAW_MARGIN)
+    if not cabinet.drop():
+        cabinet.shuffle()
+
+# Worker process: owns some of the cabinets, steps them every frame and publishes their transforms
+def run_worker(connection, indices, buffer_name, cabinet_count, folder, autoplaying, seed, physics_budget):
+    random.seed(seed)
+    rng = random.Random(seed)
+    transforms = TransformBuffer(cabinet_count, buffer_name)
+    claw_pieces = load_claw_pieces(CLAW_MAX_VERTICES, CLAW_CONCAVE)
+    catalog_sections = load_catalog()
+    layouts = load_layouts()
+    cabinets = {}
+    governors = {}  # The worker's physics budget is shared between its cabinets
+    spawn_time = {}
+    now = datetime.now()
+    for index in indices:
+        save_journal, game_data = load_save(index, folder, catalog_sections)
+        timestep = FixedTimestep(PHYSICS_RATE, PHYSICS_SUBSTEPS, MAX_STEPS_PER_FRAME)
+        cabinets[index] = Cabinet(SCREEN_WIDTH, claw_pieces, save_journal, game_data, catalog_sections, timestep,
+                                  rng=np.random.default_rng(seed + index), layouts=layouts)
+        cabinets[index].start(now)
+        governors[index] = PhysicsGovernor(physics_budget / len(indices), PHYSICS_PRESET, "cabinet %d" % (index + 1))
+        spawn_time[index] = 0.0
+    step_time = 0.0
+
+    while True:
+        message = connection.recv()
+        if message[0] == "close":
+            for cabinet in cabinets.values():
+                cabinet.close()
+            transforms.close()
+            connection.send((step_time, [governor.summary() for governor in governors.values()]))
+            return
+
+        _, slot, frame_time, commands = message
+        start = time.perf_counter()
+        won = {}
+        for index, cabinet in cabinets.items():
+            for command in commands.get(index, ()):
+                cabinet.apply(command)  # Earned coins aren't capped, like in the single cabinet game
+            if autoplaying:
+                autoplay(cabinet, rng)
+
+            # Spawn the day's balls at the same pace as the single cabinet game
+            spawn_time[index] += frame_time
+            while spawn_time[index] >= SPAWN_INTERVAL:
+                spawn_time[index] -= SPAWN_INTERVAL
+                cabinet.spawn()
+
+            prizes = cabinet.advance(frame_time)
+            if prizes:
+                won[index] = [cabinet.prize_catalog.image(prize_id) for prize_id in prizes]
+            physics_level = cabinet.govern(governors[index])
+            if physics_level != cabinet.quality:
+                cabinet.set_quality(physics_level)
+            transforms.publish(slot, index, cabinet)
+        step_time += time.perf_counter() - start
+        connection.send(won)
+
+# Draws every cabinet from one slot of the transform buffer straight into its region, with images pre-scaled to fit
+def draw_cabinets(screen, slot, transforms, regions, focus, banners, images, scale, text_cache, rotation_cache):
+    static_layer, ball_image, claw_animation_close, claw_animation_open = images
+    ball_offset = 40 * scale
+    for index, region in enumerate(regions):
+        (count, coins, claw_state, claw_frame), claw_row, ball_rows = transforms.read(slot, index)
+        view = screen.subsurface(region)  # Keeps everything drawn for the cabinet inside its region
+        view.blit(static_layer, (0, 0))
+
+        text_surface = text_cache.render(str(coins) + "x", round(64 * scale), (81, 87, 120))
+        view.blit(text_surface, text_surface.get_rect(center=(475 * scale, 618 * scale)))
+
+        claw_image = (claw_animation_open if claw_state == "ascending" else claw_animation_close)[claw_frame]
+        claw_topleft = (claw_row[0] * scale - claw_image.get_width() // 2, claw_row[1] * scale - claw_image.get_height() // 2)
+        rotation_cache.blit_rotate_center(view, claw_image, claw_topleft, -math.degrees(claw_row[2]))
+        if count:
+            rotation_cache.blit_many(view, ball_image, ball_rows[:, :2] * scale - ball_offset, -np.degrees(ball_rows[:, 2]))
+
+        banner = banners.get(index)
+        if banner is not None:
+            prize_image, until = banner
+            if time.perf_counter() < until:
+                view.blit(prize_image, prize_image.get_rect(center=(region.width // 2, region.height // 2)))
+            else:
+                del banners[index]
+
+        if index == focus:
+            pygame.draw.rect(screen, (255, 173, 192), region, 3)
+    pygame.display.flip()
+
+def scale_image(image, scale):
+    width, height = image.get_size()
+    return pygame.transform.smoothscale(image, (max(1, round(width * scale)), max(1, round(height * scale))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive several claw machine cabinets from one host.")
+    parser.add_argument("--cabinets", type=int, default=4, help="number of cabinets")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core, at most one per cabinet)")
+    parser.add_argument("--columns", type=int, default=None, help="cabinets per row of the window")
+    parser.add_argument("--size", type=int, default=CABINET_SIZE, help="size each cabinet is drawn at")
+    parser.add_argument("--save-folder", default=SAVE_FOLDER, help="folder of the per-cabinet save files")
+    parser.add_argument("--autoplay", action="store_true", help="let the cabinets play by themselves")
+    parser.add_argument("--headless", action="store_true", help="run without a window")
+    parser.add_argument("--unthrottled", action="store_true", help="run frames back to back (each still simulates 1/FPS seconds)")
+    parser.add_argument("--frames", type=int, default=None, help="stop after this many frames")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the autoplay and shuffles")
+    parser.add_argument("--physics-budget", type=float, default=PHYSICS_BUDGET_MS, help="physics milliseconds per frame and worker")
+    args = parser.parse_args()
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    cabinet_count = args.cabinets
+    worker_count = args.workers or min(cabinet_count, os.cpu_count())
+    columns = args.columns or math.ceil(math.sqrt(cabinet_count))
+    rows = math.ceil(cabinet_count / columns)
+    regions = [pygame.Rect(index % columns * args.size, index // columns * args.size, args.size, args.size)
+               for index in range(cabinet_count)]
+
+    # Every worker owns every n-th cabinet and attaches to the shared transforms by name
+    transforms = TransformBuffer(cabinet_count)
+    connections = []
+    processes = []
+    for worker in range(worker_count):
+        connection, worker_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(worker_connection, list(range(worker, cabinet_count, worker_count)), transforms.name,
+                  cabinet_count, args.save_folder, args.autoplay, args.seed + worker, args.physics_budget),
+            daemon=True,
+        )
+        process.start()
+        connections.append(connection)
+        processes.append(process)
+
+    pygame.init()
+    screen = pygame.display.set_mode((columns * args.size, rows * args.size))
+    pygame.display.set_caption("Claw Machine Host (%d cabinets)" % cabinet_count)
+
+    # Images scaled once to the size the cabinets are drawn at
+    asset_pack = AssetPack.open(ASSET_PACK_FILE)
+    scale = args.size / SCREEN_WIDTH
+    static_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    static_layer.fill((0, 0, 0))
+    static_layer.blit(load_image("images/machine.png", pack=asset_pack), (0, 0))
+    static_layer.blit(load_image("images/logo.png", LOGO_SIZE, asset_pack), (295, 10))
+    claw_animation_close = [scale_image(load_image("images/claw%d.png" % i, pack=asset_pack, convert=True), scale) for i in (1, 2, 3)]
+    images = (scale_image(static_layer, scale), scale_image(load_image("images/gacha.png", BALL_SIZE, asset_pack, convert=True), scale),
+              claw_animation_close, claw_animation_close[::-1])
+    prize_box = (round(POPUP_PRIZE_BOX[0] * scale), round(POPUP_PRIZE_BOX[1] * scale))
+    text_cache = TextCache()
+    rotation_cache = RotationCache(ROTATION_STEP)
+    prize_cache = AssetCache(pack=asset_pack)
+
+    clock = pygame.time.Clock()
+    focus = 0  # Cabinet the keyboard controls (Tab or a click moves it)
+    banners = {}  # Cabinet -> (prize image, time to hide it)
+    commands = {}
+    coin_time = 0.0
+    frame = 0
+    draw_time = 0.0
+    start = time.perf_counter()
+    running = True
+
+    while running:
+        frame_time = 1 / FPS if args.unthrottled else clock.tick(FPS) / 1000
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_TAB:
+                    focus = (focus + 1) % cabinet_count
+                if event.key == pygame.K_LEFT:
+                    commands.setdefault(focus, []).append((LEFT, True))
+                if event.key == pygame.K_RIGHT:
+                    commands.setdefault(focus, []).append((RIGHT, True))
+                if event.key == pygame.K_SPACE:
+                    commands.setdefault(focus, []).append((DROP, True))
+                if event.key == pygame.K_s:
+                    commands.setdefault(focus, []).append((SHUFFLE, True))
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_LEFT:
+                    commands.setdefault(focus, []).append((LEFT, False))
+                if event.key == pygame.K_RIGHT:
+                    commands.setdefault(focus, []).append((RIGHT, False))
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                for index, region in enumerate(regions):
+                    if region.collidepoint(event.pos):
+                        focus = index
+
+        coin_time += frame_time
+        if coin_time >= COIN_INTERVAL:
+            coin_time -= COIN_INTERVAL
+            for index in range(cabinet_count):
+                commands.setdefault(index, []).append((COIN, True))
+
+        # Step this frame in the workers while the previous one is drawn from the other slot
+        slot = frame % TransformBuffer.SLOTS
+        for connection in connections:
+            connection.send(("frame", slot, frame_time, commands))
+        commands = {}
+        if frame:
+            draw_start = time.perf_counter()
+            draw_cabinets(screen, 1 - slot, transforms, regions, focus, banners, images, scale, text_cache, rotation_cache)
+            draw_time += time.perf_counter() - draw_start
+        for connection in connections:
+            for index, prize_images in connection.recv().items():
+                prize_image = prize_cache.get_fitted(prize_images[-1], prize_box)
+                banners[index] = (prize_image, time.perf_counter() + PRIZE_BANNER_SECONDS)
+
+        frame += 1
+        if args.frames and frame >= args.frames:
+            running = False
+
+    elapsed = time.perf_counter() - start
+    step_times = []
+    switches = []
+    for connection in connections:
+        connection.send(("close",))
+        step_time, summaries = connection.recv()
+        step_times.append(step_time)
+        switches.extend(summaries)
+    for process in processes:
+        process.join()
+    transforms.close()
+    pygame.quit()
+
+    print("%d cabinets on %d workers: %d frames in %.1f s (%.1f frames/s, %.0f cabinet steps/s)" % (
+        cabinet_count, worker_count, frame, elapsed, frame / elapsed, frame * cabinet_count * PHYSICS_RATE / FPS / elapsed))
+    print("worker stepping %s ms/frame, host drawing %.2f ms/frame" % (
+        " ".join("%.2f" % (step_time * 1000 / frame) for step_time in step_times), draw_time * 1000 / frame))
+    print("physics quality: %d downgrades and %d upgrades over %d cabinets" % (
+        sum(down for down, _ in switches), sum(up for _, up in switches), cabinet_count))
+
+if __name__ == "__main__":
+    main()
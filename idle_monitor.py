@@ -0,0 +1,33 @@
+import time
+
+class IdleMonitor:
+    # Constants declaration
+    ACTIVE, IDLE = 0, 1
+    STATES = ("active", "idle")
+
+    def __init__(self):
+        self.wall_time = [0.0, 0.0]  # Seconds spent in each state
+        self.cpu_time = [0.0, 0.0]  # CPU seconds this process used in each state
+        self.frames = [0, 0]
+        self.last_wall = time.perf_counter()
+        self.last_cpu = time.process_time()
+
+    # Charges the time since the last call to the state the frame was in
+    def frame(self, idle):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        state = self.IDLE if idle else self.ACTIVE
+        self.wall_time[state] += wall - self.last_wall
+        self.cpu_time[state] += cpu - self.last_cpu
+        self.frames[state] += 1
+        self.last_wall = wall
+        self.last_cpu = cpu
+
+    # One line per state: frames, wall time, CPU time and CPU use as a share of one core
+    def report(self):
+        lines = []
+        for state, name in enumerate(self.STATES):
+            wall = self.wall_time[state]
+            usage = self.cpu_time[state] / wall * 100 if wall else 0.0
+            lines.append("%-6s %6d frames %8.1f s %8.2f s CPU (%.1f%% of a core)" % (name, self.frames[state], wall, self.cpu_time[state], usage))
+        return "\n".join(lines)
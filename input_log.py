@@ -0,0 +1,199 @@
+import os
+import json
+import random
+from datetime import datetime
+import pygame
+
+from save_format import save_from_dict
+
+# Version of the recording format, raised whenever the game reads its inputs in a different order or applies them on
+# different frames (2: input reaches the physics thread a frame later)
+RECORDING_VERSION = 2
+
+# Event types that affect the game (everything else, like mouse motion or window events, is ignored)
+RECORDED_EVENTS = {pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP}
+
+def is_recorded(event):
+    return event.type in RECORDED_EVENTS or event.type >= pygame.USEREVENT
+
+def event_to_json(event):
+    entry = {"type": event.type}
+    for name, value in event.dict.items():
+        if isinstance(value, (bool, int, float, str)):
+            entry[name] = value
+        elif isinstance(value, tuple):
+            entry[name] = list(value)
+    return entry
+
+def event_from_json(entry):
+    values = {name: tuple(value) if isinstance(value, list) else value for name, value in entry.items() if name != "type"}
+    return pygame.event.Event(entry["type"], **values)
+
+class ReplayDesync(Exception):
+    pass
+
+# A recording made by a version of the game that replays differently
+class IncompatibleRecording(Exception):
+    pass
+
+# Input straight from pygame and the real clock (normal play)
+class LiveInput:
+    def __init__(self):
+        self.seed = None  # Random numbers are not seeded
+        self.start_time = datetime.now()
+        self.pending = []  # Event that woke an idle wait, handed out by the next poll
+
+    def load_save_data(self, save_journal):
+        return save_journal.load()
+
+    def poll(self):
+        events = self.pending + pygame.event.get()
+        self.pending = []
+        return events
+
+    # Waits for the next frame (while idle, sleeps until input arrives or the frame is due)
+    def frame_time(self, clock, fps, idle=False):
+        if idle:
+            event = pygame.event.wait(1000 // fps)
+            if event.type != pygame.NOEVENT:
+                self.pending.append(event)
+            return clock.tick() / 1000
+        return clock.tick(fps) / 1000
+
+    # Sleeps until input arrives or the timeout (milliseconds) passes, then polls (overlays wait here instead of spinning)
+    def wait_for_input(self, timeout):
+        event = pygame.event.wait(timeout)
+        if event.type != pygame.NOEVENT:
+            self.pending.append(event)
+        return self.poll()
+
+    def ticks(self):
+        return pygame.time.get_ticks()
+
+    # Physics quality preset for the next frame (the governor's pick, or the recording's when replaying)
+    def physics_level(self, level):
+        return level
+
+    def finish(self, result):
+        pass
+
+# Plays normally, logging the seed, the starting save data and every input and timing the game reads
+class RecordingInput(LiveInput):
+    def __init__(self, filename, low_power_idle=True):
+        super().__init__()
+        self.low_power_idle = low_power_idle  # Idle frames simulate no time, so a replay has to idle the same way
+        self.seed = int.from_bytes(os.urandom(4), "little")
+        random.seed(self.seed)
+        self.file = open(filename, 'w')
+        self.empty_polls = 0
+        self.level = None  # Physics preset last written
+
+    def load_save_data(self, save_journal):
+        save_data = save_journal.load()
+        self.write({"version": RECORDING_VERSION, "seed": self.seed, "start_time": self.start_time.isoformat(),
+                    "low_power_idle": self.low_power_idle, "save_data": save_data.to_dict()})
+        return save_data
+
+    def write(self, entry):
+        if self.empty_polls:
+            self.file.write(json.dumps({"e": self.empty_polls}) + "\n")  # Runs of empty polls are stored as a count
+            self.empty_polls = 0
+        self.file.write(json.dumps(entry) + "\n")
+
+    def poll(self):
+        events = super().poll()
+        recorded = [event_to_json(event) for event in events if is_recorded(event)]
+        if recorded:
+            self.write({"p": recorded})
+        else:
+            self.empty_polls += 1
+        return events
+
+    def frame_time(self, clock, fps, idle=False):
+        frame_time = super().frame_time(clock, fps, idle)
+        self.write({"dt": frame_time})
+        return frame_time
+
+    def ticks(self):
+        ticks = pygame.time.get_ticks()
+        self.write({"t": ticks})
+        return ticks
+
+    # Only switches are written, the first call writes the preset the session started with
+    def physics_level(self, level):
+        if level != self.level:
+            self.write({"q": level})
+            self.level = level
+        return level
+
+    def finish(self, result):
+        self.write({"result": result})
+        self.file.close()
+
+# Feeds a recorded session back through the game, optionally without waiting between frames
+class ReplayInput(LiveInput):
+    def __init__(self, filename, unthrottled=False):
+        with open(filename, 'r') as file:
+            self.entries = [json.loads(line) for line in file]
+        header = self.entries[0]
+        version = header.get("version", 1)  # Recordings from before the physics thread have no version
+        if version != RECORDING_VERSION:
+            raise IncompatibleRecording("%s was recorded in format %d, this game replays format %d (record it again)" % (
+                filename, version, RECORDING_VERSION))
+        self.seed = header["seed"]
+        self.start_time = datetime.fromisoformat(header["start_time"])
+        self.save_data = header["save_data"]
+        self.low_power_idle = header.get("low_power_idle", True)  # The game forces it, whatever --full-power says
+        self.unthrottled = unthrottled
+        self.position = 1
+        self.empty_polls = 0
+        self.matched = None  # Whether the replay ended the same way the recording did
+        self.level = None  # Physics preset from the recording (None until it names one)
+        random.seed(self.seed)
+
+    # The save the session started from (recordings made before the compact save format hold the old JSON save)
+    def load_save_data(self, save_journal):
+        return save_from_dict(self.save_data, save_journal.catalog_sections)
+
+    def next_entry(self, kind):
+        if self.position >= len(self.entries):
+            raise ReplayDesync("replay ran past the end of the recording")
+        entry = self.entries[self.position]
+        if kind not in entry:
+            raise ReplayDesync("expected %s, recording has %s at entry %d" % (kind, list(entry), self.position))
+        self.position += 1
+        return entry[kind]
+
+    def poll(self):
+        pygame.event.clear()  # Live input is ignored while replaying
+        if self.empty_polls:
+            self.empty_polls -= 1
+            return []
+        entry = self.entries[self.position] if self.position < len(self.entries) else {}
+        if "e" in entry:
+            self.empty_polls = self.next_entry("e") - 1
+            return []
+        return [event_from_json(event) for event in self.next_entry("p")]
+
+    def frame_time(self, clock, fps, idle=False):
+        clock.tick() if self.unthrottled else clock.tick(fps)
+        return self.next_entry("dt")
+
+    # The recording already holds what the overlay received, there is nothing to wait for
+    def wait_for_input(self, timeout):
+        return self.poll()
+
+    def ticks(self):
+        return self.next_entry("t")
+
+    # Switches where the recording did (recordings made before the governor keep the starting preset)
+    def physics_level(self, level):
+        if self.position < len(self.entries) and "q" in self.entries[self.position]:
+            self.level = self.next_entry("q")
+        return level if self.level is None else self.level
+
+    def finish(self, result):
+        # Compare through JSON so tuples and lists compare the same way
+        expected = self.entries[-1].get("result")
+        self.matched = json.loads(json.dumps(result)) == expected
+        print("Replay %s the recorded session" % ("matched" if self.matched else "did NOT match"))
@@ -1,94 +1,69 @@
 import os
-import json
 import math
+import argparse
 import pygame
 import pymunk
-import random
-import tempfile
 import pymunk.pygame_util
 import numpy as np
-from PIL import Image
-from datetime import datetime
-from scipy.spatial import ConvexHull
-
-# Claw and GachaBall classes
-from claw import Claw
-from gacha_ball import GachaBall
-
-# Creates the container where the gacha balls will be contained
-def create_container(space):
-    container_width = 770  
-    container_height = 450 
-    center_x = 350  
-    center_y = 340  
-
-    half_width = container_width // 2
-    half_height = container_height // 2
-
-    # Define the corner points of the box
-    top_left = (center_x - half_width, center_y - half_height)
-    top_right = (center_x + half_width, center_y - half_height)
-    bottom_left = (center_x - half_width, center_y + half_height)
-    bottom_right = (center_x + half_width, center_y + half_height)
-
-    # Define static lines forming the box
-    static_lines = [
-        pymunk.Segment(space.static_body, top_left, top_right, 50),  # Top
-        pymunk.Segment(space.static_body, top_right, bottom_right, 50),  # Right
-        pymunk.Segment(space.static_body, bottom_right, bottom_left, 50),  # Bottom
-        pymunk.Segment(space.static_body, bottom_left, top_left, 50),  # Left
-    ]
-
-    # Set elasticity and add lines to the space
-    for line in static_lines:
-        line.elasticity = 0.6 # Allows the gacha balls to partially bounce off the container
-        space.add(line)
+
+# Cabinet (space, claw and balls of the machine)
+from cabinet import Cabinet, LEFT, RIGHT, DROP, SHUFFLE, COIN, SPAWN
+from asset_cache import AssetCache
+from asset_pack import AssetPack, ASSET_PACK_FILE, load_image
+from claw_hull import HullCache, get_claw_pieces_from_surface
+from sprite_cache import RotationCache
+from text_cache import TextCache
+from renderer import LayeredRenderer
+from frame_profiler import FrameProfiler
+from input_log import LiveInput, RecordingInput, ReplayInput, IncompatibleRecording, ReplayDesync, is_recorded
+from idle_monitor import IdleMonitor
+from physics_governor import PhysicsGovernor
+from physics_thread import PhysicsThread
+from timestep import FixedTimestep
+from save_journal import SaveJournal
+from save_format import SAVE_FILE
+from prize_catalog import PRIZE_CATALOG_FILE, load_catalog
+from pile_layouts import PILE_LAYOUTS_FILE, load_layouts
+from shelf_pages import ShelfPages
+
+# Screen dimensions constants
+SCREEN_WIDTH = 700
+SCREEN_HEIGHT = 700
+
+FPS = 60  # Render rate, the physics rate does not depend on it
+PHYSICS_RATE = 60  # Fixed physics steps per second
+PHYSICS_SUBSTEPS = 1  # space.step calls per physics step (the physics presets set their own once the governor switches)
+MAX_STEPS_PER_FRAME = 5  # Caps catch-up steps after a slow frame
+BALL_SIZE = (70, 70)  # Size the gacha ball sprite is drawn at
+LOGO_SIZE = (120, 120)
+SHELF_PRIZE_BOX = (100, 100)  # Prize images are scaled to fit these boxes
+POPUP_PRIZE_BOX = (150, 150)
+FULL_FRAME_FLIP = False  # Redraw and flip the whole window every frame instead of only the changed parts
+PROFILE_FRAMES = False  # Time every frame from the start (otherwise from the first F3 press)
+PROFILE_DUMP_FILE = None  # Write the frame timings here on exit (.csv, or .jsonl for JSON lines)
+ROTATION_STEP = 1  # Degrees per pre-rotated sprite (higher uses less memory, lower looks smoother)
+SAVE_CHECKPOINT_EVENTS = 20  # Rewrite the save file after this many journaled events
+SAVE_CHECKPOINT_SECONDS = 30  # Or after this many seconds with unsaved events
+IDLE_FPS = 10  # Frame rate once everything rests and no input arrives
+LOW_POWER_IDLE = True  # Drop to IDLE_FPS and keep the last frame while resting (otherwise only measure it)
+IDLE_REPORT = False  # Print the time and CPU spent resting and active on exit
+PHYSICS_PRESET = "normal"  # Best physics quality (see physics_governor.py), lower presets are used while over budget
+PHYSICS_BUDGET_MS = 6  # Physics time per frame the governor keeps under (a frame at 60 FPS has 16.7 ms)
+PHYSICS_THREAD = True  # Simulate each frame on a worker thread while the frame before is drawn (False steps it inline)
+OVERLAY_WAIT_MS = 1000  # Longest the shelf and the prize popup sleep waiting for input
+CLAW_MAX_VERTICES = None  # Points per convex piece of the claw's collision shape (None keeps every hull point, 8 is
+                         # cheaper but cuts the corners off and makes grabs succeed more often, check simulate.py first)
+CLAW_CONCAVE = False  # Collide with the real claw outline split into convex pieces, gap between the prongs included
 
 # Draws a button on the screen
 def draw_button(screen, text, x, y, width, height, color, text_color):
     pygame.draw.rect(screen, (0, 0, 0), (x - 2, y - 2, width + 4, height + 4)) # border
     pygame.draw.rect(screen, color, (x, y, width, height))
-    font = pygame.font.Font(None, 20)
-    label = font.render(text, True, text_color)
+    label = text_cache.render(text, 20, text_color)
     text_rect = label.get_rect(center=(x + width // 2, y + height // 2))
     screen.blit(label, text_rect)
     return pygame.Rect(x, y, width, height)
 
-# Gets the points around the shape of the claw animation (ensures the game recognizes the different claw shapes)
-def get_claw_points_from_surface(surface, scale=1.0):
-
-    # Save the surface to a file
-    temp_file = os.path.join(tempfile.gettempdir(), "claw_temp.png")
-    pygame.image.save(surface, temp_file)
-    
-    # Load it with PIL
-    img = Image.open(temp_file).convert("RGBA")
-    
-    # Extract alpha channel and compute convex hull
-    alpha = np.array(img)[:, :, 3]
-    non_transparent_coords = np.column_stack(np.where(alpha > 0))
-    hull = ConvexHull(non_transparent_coords)
-    hull_points = non_transparent_coords[hull.vertices]
-    
-    # Center and scale points
-    center_x = (hull_points[:, 1].max() + hull_points[:, 1].min()) // 2
-    center_y = (hull_points[:, 0].max() + hull_points[:, 0].min()) // 2
-    scaled_points = [
-        ((x - center_x) * scale, (y - center_y) * scale)
-        for y, x in hull_points
-    ]
-    
-    # Remove temporary file
-    os.remove(temp_file)
-    
-    return scaled_points
-
-# Function to facilitate rotations around its center
-def blit_rotate_center(surf, image, topleft, angle):
-    rotated_image = pygame.transform.rotate(image, angle)
-    new_rect = rotated_image.get_rect(center=image.get_rect(topleft=topleft).center)
-    surf.blit(rotated_image, new_rect.topleft)
-
 # Display a pop-up overlay showing the prize after grabbing a gacha ball
 def show_prize_popup(screen, prize_image):
 
@@ -99,127 +74,135 @@ def show_prize_popup(screen, prize_image):
     screen.blit(overlay, (0, 0))
     
     # Draw prize text
-    font = pygame.font.Font(None, 50)
-    text = font.render("Congratulations! You won:", True, (255, 255, 255))
+    text = text_cache.render("Congratulations! You won:", 50, (255, 255, 255))
     text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 130))
     screen.blit(text, text_rect)
 
-    # Resize prize image
-    original_width, original_height = prize_image.get_size()
-    scale_factor = min(150 / original_width, 150 / original_height)
-    new_width = int(original_width * scale_factor)
-    new_height = int(original_height * scale_factor)
-    prize_image = pygame.transform.scale(prize_image, (new_width, new_height))
-
-    # Draw prize image
+    # Draw prize image (already scaled to fit the popup by the prize cache)
     prize_rect = prize_image.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
     screen.blit(prize_image, prize_rect)
     
     # Draw instructions
-    font_instruction = pygame.font.Font(None, 30)
-    instruction_text = font_instruction.render("Press ENTER to continue...", True, (255, 255, 255))
+    instruction_text = text_cache.render("Press ENTER to continue...", 30, (255, 255, 255))
     instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 150))
     screen.blit(instruction_text, instruction_rect)
     
     pygame.display.flip() # Updates the display
     
-    # Wait for ENTER key press to continue
+    # Wait for ENTER key press to continue (sleeping until input arrives)
     waiting = True
     while waiting:
-        for event in pygame.event.get():
+        for event in input_log.wait_for_input(OVERLAY_WAIT_MS):
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:  # Check if Enter key is pressed
                     waiting = False
 
+# Draws the content of the specified main section onto the shelf window
+def draw_shelf_section(shelf_window, main_sections, section_index, columns_per_section, locked_slots):
+    shelf_width = shelf_window.get_width()
+    padding = 20  # Space between prizes
+
+    shelf_window.fill((230, 230, 230)) # Clears the window
+    y_position = 40
+    section_name, subsections = main_sections[section_index]
+
+    # Draw main section header (with how many of its prizes are won)
+    header_text = text_cache.render("%s (%d/%d)" % ((section_name,) + prize_catalog.section_won[section_name]), 30, (0, 0, 0))
+    header_rect = header_text.get_rect(center=(shelf_width // 2, y_position))
+    shelf_window.blit(header_text, header_rect)
+    y_position += 75  # Space below the header
+
+    for subsection_index, (subsection_name, prizes) in enumerate(subsections.items()):
+        # Get the number of columns for this subsection
+        columns = columns_per_section[section_index][subsection_index]
+
+        # Draw subsection header
+        subheader_text = text_cache.render("%s (%d/%d)" % ((subsection_name,) + prize_catalog.subsection_won[(section_name, subsection_name)]), 28, (100, 100, 100))
+        subheader_rect = subheader_text.get_rect(center=(shelf_width // 2, y_position))
+        shelf_window.blit(subheader_text, subheader_rect)
+        y_position += 30  # Space below the subsection header
+
+        for i, prize_id in enumerate(prizes):
+            image_path = prize_catalog.image(prize_id)  # Image paths come from the catalog, not the save
+
+            # Size of the prize image once scaled to fit its slot
+            new_width, new_height = prize_cache.fitted_size(image_path, SHELF_PRIZE_BOX)
+
+            # Calculate starting positions for the grid
+            grid_width = columns * (new_width + padding) - padding
+            start_x = (shelf_width - grid_width) // 2
+            row = i // columns
+            col = i % columns
+
+            x = start_x + col * (new_width + padding)
+            y = y_position + row * (new_height + padding)
+
+            # Draw prize slot background
+            slot_rect = pygame.Rect(x - 5, y - 5, new_width + 10, new_height + 10)
+            pygame.draw.rect(shelf_window, (200, 200, 200), slot_rect, border_radius=10)
+
+            # Display prize image
+            if prize_catalog.is_won(prize_id):
+                image = prize_cache.get_fitted(image_path, SHELF_PRIZE_BOX)
+            else:
+                image = locked_slots.get((new_width, new_height))
+                if image is None:
+                    image = pygame.Surface((new_width, new_height), pygame.SRCALPHA)
+                    image.fill((0, 0, 0, 180))  # Dimmed effect for locked prizes
+                    locked_slots[(new_width, new_height)] = image
+
+            shelf_window.blit(image, (x, y))
+
+        # Move Y position for the next subsection
+        rows = (len(prizes) + columns - 1) // columns  # Calculate the number of rows
+        y_position += rows * (new_height + padding) + 10  # Space between subsections
+
 # Displays a shelf window showing the prize collection divided into sections and subsections
 def display_shelves_with_nested_sections(prize_sections, columns_per_section):
     shelf_width, shelf_height = 700, 700
-    shelf_window = pygame.Surface((shelf_width, shelf_height))
-    shelf_window.fill((230, 230, 230))  # Light gray background
-    section_font = pygame.font.Font(None, 30)
-    subsection_font = pygame.font.Font(None, 28)
-    padding = 20  # Space between prizes
+    locked_slots = {}  # Dimmed placeholders for locked prizes, one per slot size
 
     # Main section list and navigation variables
     main_sections = list(prize_sections.items())
     total_sections = len(main_sections)
     current_section_index = 0
-
-    # Draws the content of the specified main section.
-    def draw_section(section_index):
-
-        shelf_window.fill((230, 230, 230)) # Clears the window
-        y_position = 40
-        section_name, subsections = main_sections[section_index]
-
-        # Draw main section header
-        header_text = section_font.render(section_name, True, (0, 0, 0))
-        header_rect = header_text.get_rect(center=(shelf_width // 2, y_position))
-        shelf_window.blit(header_text, header_rect)
-        y_position += 75  # Space below the header
-
-        for subsection_index, (subsection_name, prizes) in enumerate(subsections.items()):
-            # Get the number of columns for this subsection
-            columns = columns_per_section[section_index][subsection_index]
-
-            # Draw subsection header
-            subheader_text = subsection_font.render(subsection_name, True, (100, 100, 100))
-            subheader_rect = subheader_text.get_rect(center=(shelf_width // 2, y_position))
-            shelf_window.blit(subheader_text, subheader_rect)
-            y_position += 30  # Space below the subsection header
-
-            for i, (name, data) in enumerate(prizes.items()):
-
-                # Load and scale prize image
-                image = pygame.image.load(data["image"]).convert_alpha()
-                original_width, original_height = image.get_size()
-                scale_factor = min(100 / original_width, 100 / original_height)
-                new_width = int(original_width * scale_factor)
-                new_height = int(original_height * scale_factor)
-
-                # Calculate starting positions for the grid
-                grid_width = columns * (new_width + padding) - padding
-                start_x = (shelf_width - grid_width) // 2
-                row = i // columns
-                col = i % columns
-
-                x = start_x + col * (new_width + padding)
-                y = y_position + row * (new_height + padding)
-
-                # Draw prize slot background
-                slot_rect = pygame.Rect(x - 5, y - 5, new_width + 10, new_height + 10)
-                pygame.draw.rect(shelf_window, (200, 200, 200), slot_rect, border_radius=10)
-
-                # Display prize image
-                if data["won"]:
-                    image = pygame.transform.scale(image, (new_width, new_height))
-                else:
-                    image = pygame.Surface((new_width, new_height), pygame.SRCALPHA)
-                    image.fill((0, 0, 0, 180))  # Dimmed effect for locked prizes
-
-                shelf_window.blit(image, (x, y))
-
-            # Move Y position for the next subsection
-            rows = (len(prizes) + columns - 1) // columns  # Calculate the number of rows
-            y_position += rows * (new_height + padding) + 10  # Space between subsections
+    shown_section_index = None  # Page currently on screen
 
     # Draw navigation buttons for moving between category pages
-    def draw_navigation_buttons():
-        if current_section_index > 0:  # Left arrow
+    def draw_navigation_buttons(shelf_window, section_index):
+        if section_index > 0:  # Left arrow
             pygame.draw.polygon(shelf_window, (0, 0, 0), [(20, shelf_height // 2), (50, shelf_height // 2 - 20), (50, shelf_height // 2 + 20)])
-        if current_section_index < total_sections - 1:  # Right arrow
+        if section_index < total_sections - 1:  # Right arrow
             pygame.draw.polygon(shelf_window, (0, 0, 0), [(shelf_width - 20, shelf_height // 2), (shelf_width - 50, shelf_height // 2 - 20), (shelf_width - 50, shelf_height // 2 + 20)])
 
+    # Composites a whole page: the section's prizes and the arrows
+    def draw_page(section_index):
+        shelf_window = pygame.Surface((shelf_width, shelf_height))
+        draw_shelf_section(shelf_window, main_sections, section_index, columns_per_section, locked_slots)
+        draw_navigation_buttons(shelf_window, section_index)
+        return shelf_window
+
+    # Key, version and drawing of a page for the page cache (the version is how many prizes of the section are won)
+    def page(section_index):
+        section_name = main_sections[section_index][0]
+        return section_index, prize_catalog.section_won[section_name], lambda: draw_page(section_index)
+
     # Main loop for the shelf window
     running = True
     while running:
-        draw_section(current_section_index)
-        draw_navigation_buttons()
-        screen.blit(shelf_window, ((SCREEN_WIDTH - shelf_width) // 2, (SCREEN_HEIGHT - shelf_height) // 2))
-        pygame.display.flip()
-
-        # Manages user input
-        for event in pygame.event.get():
+        # The screen is only drawn again when the player moves to another page
+        if current_section_index != shown_section_index:
+            shelf_window = shelf_pages.get(*page(current_section_index))
+            screen.blit(shelf_window, ((SCREEN_WIDTH - shelf_width) // 2, (SCREEN_HEIGHT - shelf_height) // 2))
+            pygame.display.flip()
+            shown_section_index = current_section_index
+
+            # Draw the pages on either side in the background so moving to them is instant
+            neighbours = [index for index in (current_section_index - 1, current_section_index + 1) if 0 <= index < total_sections]
+            shelf_pages.prefetch([page(index) for index in neighbours])
+
+        # Manages user input (sleeping until some arrives)
+        for event in input_log.wait_for_input(OVERLAY_WAIT_MS):
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
@@ -236,65 +219,30 @@ def display_shelves_with_nested_sections(prize_sections, columns_per_section):
                         current_section_index -= 1
                 elif (shelf_width - 50) <= mouse_x <= (shelf_width - 20) and (shelf_height // 2 - 20) <= mouse_y <= (shelf_height // 2 + 20):  # Right arrow
                     if current_section_index < total_sections - 1:
-                        current_section_index += 1              
-
-# Saves the game progress into JSON file
-def save_game_data(game_data, filename='save-file.json'):
-    with open(filename, 'w') as file:
-        json.dump(game_data, file, indent=4)
-
-# Marks off a prize as unlocked
-def markPrize():
-    # List of prizes that can be won
-    available_prizes = [
-        (main_section, subsection, key)
-        for main_section, subsections in prize_sections.items()
-        for subsection, prizes in subsections.items()
-        for key, prize in prizes.items()
-        if not prize["won"]
-    ]
-
-    if available_prizes: # If a prize is available
-
-        # Randomly select a prize from the available ones
-        selected_main_section, selected_subsection, prize_key = random.choice(available_prizes)
-
-        # Mark the prize as won in prize_sections
-        prize_sections[selected_main_section][selected_subsection][prize_key]["won"] = True
-
-        # Show the prize popup with the prize image
-        prize_image = pygame.image.load(
-            prize_sections[selected_main_section][selected_subsection][prize_key]["image"]
-        ).convert_alpha()
-        show_prize_popup(screen, prize_image)
+                        current_section_index += 1
+
+    shelf_pages.wait()  # The game draws with the same caches as the pages
+
+# Shows the prize the claw won (picked and marked won by the physics thread)
+def markPrize(prize_id):
+    # Show the prize popup with the prize image
+    prize_image = prize_cache.get_fitted(prize_catalog.image(prize_id), POPUP_PRIZE_BOX)
+    show_prize_popup(screen, prize_image)
 
 # Main game loop
 def game_loop():
-    claw = Claw(SCREEN_WIDTH, space) # Claw declaration
     running = True
     
-    last_time = pygame.time.get_ticks()  # Store the time at the start   
-
-    if datetime.now().date() != datetime.fromisoformat(data.get("Last Saved DateTime")).date():
-        i = 0 # Gacha balls returns to 20 after the next day
-    else:
-        i = 20 - data.get("Gacha Balls")
+    last_time = input_log.ticks()  # Store the time at the start   
 
-    # Stores the number of coins 
-    coinNum = data.get("Coins")
-
-    # Increments coin accumulated during idle time 
-    coinNum += int(abs((datetime.now() - datetime.fromisoformat(data.get("Last Saved DateTime"))).total_seconds())/300)
-
-    # Ensures max number of coins is 20
-    if coinNum > 20:
-        coinNum = 20
+    # Balls left for today and coins earned while the game was closed (from the recorded time when replaying)
+    cabinet.start(input_log.start_time)
 
     # Loading of left and right buttons
-    leftbutton1 = pygame.image.load("images/left-button1.png").convert_alpha()
-    leftbutton2 = pygame.image.load("images/left-button2.png").convert_alpha()
-    rightbutton1 = pygame.image.load("images//right-button1.png").convert_alpha()
-    rightbutton2 = pygame.image.load("images//right-button2.png").convert_alpha()
+    leftbutton1 = load_image("images/left-button1.png", pack=asset_pack, convert=True)
+    leftbutton2 = load_image("images/left-button2.png", pack=asset_pack, convert=True)
+    rightbutton1 = load_image("images/right-button1.png", pack=asset_pack, convert=True)
+    rightbutton2 = load_image("images/right-button2.png", pack=asset_pack, convert=True)
 
     # Button positions
     left_button_rect = leftbutton1.get_rect(topleft=(50, 575))
@@ -302,189 +250,317 @@ def game_loop():
     transparent_surface = pygame.Surface((100, 100))  # Same size as the screen
     transparent_surface.set_alpha(0)
 
-    # Button flags
-    left_pressed = False
-    right_pressed = False
+    shown_coins = None  # Coin count the HUD text was last rendered for
+    show_claw_shapes = False  # F4 outlines the claw's collision pieces over its sprite
+    spawning = True  # The spawn timer is running
+
+    # Physics runs in fixed steps, decoupled from the render rate, on its own thread
+    # Each frame queues its commands and draws the snapshot of the frame before while the physics simulates this one
+    physics = PhysicsThread(cabinet, PHYSICS_THREAD)
+    clock.tick()
+
+    # Resting: every ball asleep, the claw idle and no input (then the loop idles at IDLE_FPS)
+    resting = False
+    idle = False
+    idle_monitor = IdleMonitor()
 
     while running:
-        screen.fill((0, 0, 0))  # Clear screen
-        screen.blit(background_image, (0, 0))  # Draw background
-        screen.blit(logo, (295, 10))
-        # Number of coins text
-        font = pygame.font.Font(None, 64)
-        text_surface = font.render(str(coinNum) + "x", True, (81, 87, 120))
-        text_rect = text_surface.get_rect(center=(475, 618))
-        screen.blit(text_surface, text_rect)
-
-        # Draws Show Prizes button
-        button_rect = draw_button(screen, "Show Prizes", 570, 540, 100, 50, (255, 173, 192), (0, 0, 0))
-        for event in pygame.event.get():
+        frame_time = input_log.frame_time(clock, IDLE_FPS if idle else FPS, idle)  # Real time since the last frame, in seconds
+        idle_monitor.frame(resting)
+        profiler.begin_frame()
+        events = input_log.poll()
+        profiler.mark(profiler.EVENTS)
+
+        # Wait for the frame before to finish simulating (the physics thread is idle until this frame is submitted)
+        snapshot = physics.collect()
+        profiler.mark(profiler.PHYSICS)
+        profiler.add(profiler.CLAW, snapshot.claw_time)
+        profiler.add(profiler.STEP, snapshot.physics_time)
+
+        # Show the prizes won during the frame before
+        for prize_id in snapshot.prizes:
+            markPrize(prize_id)
+            clock.tick()  # Don't simulate the time spent on the popup
+            renderer.invalidate()
+            profiler.skip()
+        if spawning and not snapshot.spawning:
+            pygame.time.set_timer(spawn_event, 0)  # All spawned, stop waking the loop
+            spawning = False
+
+        commands = []  # What the physics thread applies before stepping this frame
+        for event in events:
             if event.type == pygame.QUIT: # On termination of game
-                # Stores data to be saved in a dictionary
-                game_data = {
-                    "Last Saved DateTime": datetime.now().isoformat(),
-                    "Coins": coinNum,
-                    "Gacha Balls": len(gacha_prizes),
-                    "Prizes": prize_sections
-                }
-                save_game_data(game_data)
                 running = False
             if event.type == spawn_event:
-                if i < 20:
-                    gacha_prizes.append(GachaBall(space)) # Adds gacha balls to the list
-                    i += 1
+                commands.append((SPAWN, True)) # Adds gacha balls to the machine
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_s: # Shuffles gacha balls on 's' key press
-                    for gacha_ball in gacha_prizes:
-                        gacha_ball.shuffle()
-                if event.key == pygame.K_LEFT and claw.state == "idle":  # Only move if in idle state
-                    claw.x = max(100, claw.x - claw.SPEED)  # Stay within bounds
-                    left_pressed = True
-                if event.key == pygame.K_RIGHT and claw.state == "idle":  
-                    claw.x = min(SCREEN_WIDTH - 100, claw.x + claw.SPEED)
-                    right_pressed = True
-                if event.key == pygame.K_SPACE and claw.state == "idle":  # Space to descend claw if idle
-                    if coinNum > 0:
-                        claw.state = "descending"
-                        coinNum -= 1
+                    commands.append((SHUFFLE, True))
+                if event.key == pygame.K_F3: # Shows the frame timings overlay
+                    profiler.toggle_overlay()
+                if event.key == pygame.K_F4: # Shows the claw's collision shapes
+                    show_claw_shapes = not show_claw_shapes
+                if event.key == pygame.K_LEFT:  # Only moves while the claw is idle, staying within bounds
+                    commands.append((LEFT, True))
+                if event.key == pygame.K_RIGHT:
+                    commands.append((RIGHT, True))
+                if event.key == pygame.K_SPACE:  # Space to descend claw if idle (and a coin is left)
+                    commands.append((DROP, True))
             if event.type == pygame.KEYUP: # Ensures buttons follow key press
                 if event.key == pygame.K_LEFT:
-                    left_pressed = False
+                    commands.append((LEFT, False))
                 if event.key == pygame.K_RIGHT:
-                    right_pressed = False
+                    commands.append((RIGHT, False))
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if button_rect.collidepoint(event.pos): # Show Prizes
-                    display_shelves_with_nested_sections(prize_sections, [[3, 5, 3], [3, 5, 3], [3, 5, 3], [3, 5, 3]])
+                    display_shelves_with_nested_sections(prize_catalog.sections, [[3, 5, 3], [3, 5, 3], [3, 5, 3], [3, 5, 3]])
+                    clock.tick()  # Don't simulate the time spent browsing the shelf
+                    renderer.invalidate()
+                    profiler.skip()
                 if left_button_rect.collidepoint(event.pos):
-                    left_pressed = True
+                    commands.append((LEFT, True))
                 if right_button_rect.collidepoint(event.pos):
-                    right_pressed = True
+                    commands.append((RIGHT, True))
             if event.type == pygame.MOUSEBUTTONUP:
                 if left_button_rect.collidepoint(event.pos):
-                    left_pressed = False
+                    commands.append((LEFT, False))
                 if right_button_rect.collidepoint(event.pos):
-                    right_pressed = False
-        if claw.state == "idle":
-            if left_pressed:
-                screen.blit(leftbutton2, left_button_rect)  # Show pressed image for left button
-                claw.x = max(100, claw.x - claw.SPEED)
-            else:
-                screen.blit(leftbutton1, left_button_rect)  # Show normal image for left button
+                    commands.append((RIGHT, False))
 
-            if right_pressed:
-                screen.blit(rightbutton2, right_button_rect)  # Show pressed image for right button
-                claw.x = min(SCREEN_WIDTH - 100, claw.x + claw.SPEED)
-            else:
-                screen.blit(rightbutton1, right_button_rect)  # Show normal image for right button
-        else:
-            screen.blit(leftbutton1, left_button_rect)
-            screen.blit(rightbutton1, right_button_rect)
-
-        # Update claw body position for physics
-        claw.body.position = (claw.x, claw.body.position.y)
-
-        # Handle claw descending
-        if claw.state == "descending":
-            claw.descend(gacha_prizes, claw_points_close_list)
-        # Handle claw ascending
-        elif claw.state == "ascending":
-            if (claw.ascend(gacha_prizes, claw_points_open_list)):
-                markPrize()
-                
-        # Draw claw
-        angle = math.degrees(claw.body.angle)
-        claw_image = (
-            claw_animation_open[claw.current_frame]
-            if claw.state == "ascending"
-            else claw_animation_close[claw.current_frame]
-        )
-
-        # Updates claw
-        blit_rotate_center(
-            screen,
-            claw_image,
-            (
-                claw.body.position.x - claw_image.get_width() // 2,
-                claw.body.position.y - claw_image.get_height() // 2,
-            ),
-            -angle,
-        )
-
-        # Draw gacha balls in gacha_prizes list
-        for gacha_ball in gacha_prizes:
-            body = gacha_ball.body
-            angle = math.degrees(body.angle)
-            x, y = body.position
-            blit_rotate_center(screen, ball_image, (x - 40, y - 40), -angle)
-
-        current_time = pygame.time.get_ticks()
+        current_time = input_log.ticks()
         interval = 60000  # 1 minute
 
         # Check if a minute has passed
         if current_time - last_time >= interval:
-            coinNum += 1
+            commands.append((COIN, True))
             # Reset the minute timer
             last_time = current_time
 
-        # Step the physics simulation
-        space.step(1 / FPS)
-        pygame.display.flip() # Update display
-        clock.tick(FPS) # Maintain FPS
+        # Step the physics quality down while it runs over budget, back up once there is room (replays follow the recording)
+        if snapshot.physics_time:
+            governor.frame(snapshot.physics_time, len(snapshot.positions))
+        physics_level = input_log.physics_level(governor.level)
+
+        # Nothing moved while idle, so the time spent waiting is not simulated
+        woken = any(is_recorded(event) for event in events)
+        reuse_frame = idle and not woken
+
+        # Simulate this frame on the physics thread while the frame before is drawn
+        physics.submit(0 if idle else frame_time, commands, physics_level)
+        profiler.mark(profiler.EVENTS)
+
+        # Number of coins text (rendered again only when the count changes)
+        if snapshot.coins != shown_coins:
+            text_surface = text_cache.render(str(snapshot.coins) + "x", 64, (81, 87, 120))
+            text_rect = text_surface.get_rect(center=(475, 618))
+            shown_coins = snapshot.coins
+        renderer.set_widget("coins", text_surface, text_rect.topleft)
+
+        # Draw the buttons (pressed images only while held and the claw is idle)
+        if snapshot.claw_state == "idle":
+            renderer.set_widget("left", leftbutton2 if snapshot.left_pressed else leftbutton1, left_button_rect.topleft)
+            renderer.set_widget("right", rightbutton2 if snapshot.right_pressed else rightbutton1, right_button_rect.topleft)
+        else:
+            renderer.set_widget("left", leftbutton1, left_button_rect.topleft)
+            renderer.set_widget("right", rightbutton1, right_button_rect.topleft)
+        if profiler.show_overlay:
+            notes = ["claw shape ops %.0f/s" % snapshot.shape_ops, cache_note("images", prize_cache.stats()),
+                     cache_note("text", text_cache.stats())]
+            renderer.set_widget("profiler", profiler.overlay_surface(text_cache.font(18), notes), (10, 10))
+        profiler.mark(profiler.HUD)
+
+        # Settled and idle: keep the sprites of the last frame instead of placing them again
+        if reuse_frame:
+            renderer.reuse_sprites()
+        else:
+            draw_sprites(snapshot)
+            if show_claw_shapes:
+                draw_claw_shapes(snapshot)
+        profiler.mark(profiler.SPRITES)
+
+        renderer.present() # Update display (only the parts that changed)
+        profiler.mark(profiler.PRESENT)
+        profiler.end_frame()
+
+        # Decide how the next frame waits (only recorded events count, so replays idle on the same frames)
+        resting = not woken and snapshot.resting
+        idle = resting and LOW_POWER_IDLE
+
+    # Let the physics thread finish the last frame, then save the coins, balls and prizes
+    physics.close()
+    cabinet.close()
+
+    # How the session ended, compared against the recording when replaying
+    input_log.finish({
+        "coins": cabinet.coins,
+        "won": [prize_id for prize_id in range(len(prize_catalog)) if prize_catalog.is_won(prize_id)],
+        "balls": cabinet.gacha_prizes.positions[:len(cabinet.gacha_prizes)].round(6).tolist(),
+    })
+
+    if IDLE_REPORT:
+        print(idle_monitor.report())
+    if PROFILE_DUMP_FILE and profiler.frames:
+        profiler.dump(PROFILE_DUMP_FILE)
     pygame.quit()
 
-# Initialize Pygame
-pygame.init()
-
-# Screen dimensions constants
-SCREEN_WIDTH = 700
-SCREEN_HEIGHT = 700
-
-# Set up display
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Claw Machine Game")
-space = pymunk.Space()
-space.gravity = (0, 900)
-FPS = 60
-draw_options = pymunk.pygame_util.DrawOptions(screen)
-
-# Load images
-claw_image1 = pygame.image.load("images/claw1.png").convert_alpha()
-claw_image2 = pygame.image.load("images/claw2.png").convert_alpha()
-claw_image3 = pygame.image.load("images/claw3.png").convert_alpha()
-ball_image = pygame.image.load("images/gacha.png").convert_alpha()
-background_image = pygame.image.load("images/machine.png").convert_alpha()
-logo = pygame.image.load("images/logo.png").convert_alpha()
-
-# Resize images
-ball_image = pygame.transform.scale(ball_image, (70, 70))
-logo = pygame.transform.scale(logo, (120, 120))
-
-# Lists of frames (for claw animation)
-claw_animation_close = [claw_image1, claw_image2, claw_image3]  
-claw_animation_open = [claw_image3, claw_image2, claw_image1]
-
-create_container(space)
-
-gacha_prizes = [] # List to store gacha balls
-
-# Lists of the claw points (following the claw animation shape)
-claw_points_close_list = [get_claw_points_from_surface(image) for image in claw_animation_close]
-claw_points_open_list = [get_claw_points_from_surface(image) for image in claw_animation_open]
-
-# Timer event for spawning gacha balls
-spawn_event = pygame.USEREVENT + 1
-pygame.time.set_timer(spawn_event, 500)  # Spawns a ball every 0.5 seconds
-
-# Loads data from JSON file into a dictionary
-filename = 'save-file.json'
-with open(filename, 'r') as file:
-    data = json.load(file)
-
-# Stores the 'Prizes' sections and its sub-section in a JSON format
-prize_sections = data.get("Prizes", {})
-
-# Initializes the clock for timers
-clock = pygame.time.Clock()
-
-# Run the game loop
-game_loop()
+# One F3 overlay line with the hits, misses and hit rate of a cache
+def cache_note(name, stats):
+    return "%-6s %d hits %d misses (%.0f%%)" % (name, stats["hits"], stats["misses"], stats["hit_rate"] * 100)
+
+# Places the claw and the gacha balls of a physics snapshot (already between the last two physics states)
+def draw_sprites(snapshot):
+    # Draw claw
+    angle = math.degrees(snapshot.claw_angle)
+    claw_image = (
+        claw_animation_open[snapshot.claw_frame]
+        if snapshot.claw_state == "ascending"
+        else claw_animation_close[snapshot.claw_frame]
+    )
+
+    # Updates claw
+    claw_x, claw_y = snapshot.claw_position
+    renderer.add_sprite(*rotation_cache.place(
+        claw_image,
+        (
+            claw_x - claw_image.get_width() // 2,
+            claw_y - claw_image.get_height() // 2,
+        ),
+        -angle,
+    ))
+
+    # Draw gacha balls in gacha_prizes list
+    renderer.add_sprites(rotation_cache.place_many(ball_image, snapshot.positions - 40, -np.degrees(snapshot.angles)))
+
+# Outlines the convex pieces the claw collides with, on top of its sprite (one overlay per set of pieces)
+def draw_claw_shapes(snapshot):
+    if not snapshot.claw_shapes:
+        return  # No shapes until the claw first drops
+    overlay = claw_shape_overlays.get(snapshot.claw_shapes)
+    if overlay is None:
+        width, height = claw_animation_close[0].get_size()
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        for shape in snapshot.claw_shapes:
+            points = [(x + width // 2, y + height // 2) for x, y in shape.get_vertices()]
+            pygame.draw.polygon(overlay, (255, 0, 0), points, 1)
+        claw_shape_overlays[snapshot.claw_shapes] = overlay
+    claw_x, claw_y = snapshot.claw_position
+    renderer.add_sprite(overlay, (claw_x - overlay.get_width() // 2, claw_y - overlay.get_height() // 2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gacha Grab claw machine game.")
+    parser.add_argument("--record", metavar="FILE", help="record the seed and every input of this session")
+    parser.add_argument("--replay", metavar="FILE", help="play back a recorded session")
+    parser.add_argument("--headless", action="store_true", help="run without a window (for replays)")
+    parser.add_argument("--unthrottled", action="store_true", help="replay as fast as possible")
+    parser.add_argument("--full-power", action="store_true", help="keep the full frame rate while resting")
+    parser.add_argument("--idle-report", action="store_true", help="print the CPU time spent resting and active on exit")
+    args = parser.parse_args()
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    if args.full_power:
+        LOW_POWER_IDLE = False
+    if args.idle_report:
+        IDLE_REPORT = True
+
+    # Where input, timing and random numbers come from
+    if args.replay:
+        try:
+            input_log = ReplayInput(args.replay, args.unthrottled)
+        except IncompatibleRecording as error:
+            parser.error(str(error))
+        LOW_POWER_IDLE = input_log.low_power_idle  # Idle frames simulate no time, so replay them as they were recorded
+    elif args.record:
+        input_log = RecordingInput(args.record, LOW_POWER_IDLE)
+    else:
+        input_log = LiveInput()
+
+    # Initialize Pygame
+    pygame.init()
+
+    # Set up display
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Claw Machine Game")
+    draw_options = pymunk.pygame_util.DrawOptions(screen)
+
+    # Pre-scaled images mapped straight from the asset pack (None if it hasn't been built, see build_asset_pack.py)
+    asset_pack = AssetPack.open(ASSET_PACK_FILE)
+
+    # Load images (already resized in the asset pack, otherwise decoded and resized here)
+    # The sprites drawn every frame are converted to the display's format, the background and logo are drawn once
+    claw_image1 = load_image("images/claw1.png", pack=asset_pack, convert=True)
+    claw_image2 = load_image("images/claw2.png", pack=asset_pack, convert=True)
+    claw_image3 = load_image("images/claw3.png", pack=asset_pack, convert=True)
+    ball_image = load_image("images/gacha.png", BALL_SIZE, asset_pack, convert=True)
+    background_image = load_image("images/machine.png", pack=asset_pack)
+    logo = load_image("images/logo.png", LOGO_SIZE, asset_pack)
+
+    # Shared fonts and rendered labels for the HUD, buttons and overlays
+    text_cache = TextCache()
+
+    # Pre-rotated copies of the ball and claw sprites, filled as angles come up
+    rotation_cache = RotationCache(ROTATION_STEP)
+
+    # Shared cache of prize images for the shelf, the prize popup and markPrize
+    prize_cache = AssetCache(pack=asset_pack)
+
+    # Shelf pages composited once and kept between visits
+    shelf_pages = ShelfPages()
+
+    # Static layer: everything that never moves, composited once
+    static_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    static_layer.fill((0, 0, 0))
+    static_layer.blit(background_image, (0, 0))  # Draw background
+    static_layer.blit(logo, (295, 10))
+    button_rect = draw_button(static_layer, "Show Prizes", 570, 540, 100, 50, (255, 173, 192), (0, 0, 0)) # Draws Show Prizes button
+    renderer = LayeredRenderer(screen, static_layer, FULL_FRAME_FLIP)
+
+    # Lists of frames (for claw animation)
+    claw_animation_close = [claw_image1, claw_image2, claw_image3]  
+    claw_animation_open = [claw_image3, claw_image2, claw_image1]
+
+    # Lists of the claw's convex pieces (following the claw animation shape)
+    # The pieces are cached on disk by image content, and the open animation reuses the closing frames in reverse
+    hull_cache = HullCache()
+    claw_pieces_close_list = [get_claw_pieces_from_surface(image, CLAW_MAX_VERTICES, CLAW_CONCAVE, cache=hull_cache)
+                              for image in claw_animation_close]
+    claw_pieces_open_list = claw_pieces_close_list[::-1]
+    hull_cache.save()
+    claw_shape_overlays = {}  # Claw shapes in the space -> their outlines (F4)
+
+    # Timer event for spawning gacha balls
+    spawn_event = pygame.USEREVENT + 1
+    pygame.time.set_timer(spawn_event, 500)  # Spawns a ball every 0.5 seconds
+
+    # Every prize and its image (the save only keeps which of them are won)
+    catalog_sections = load_catalog(PRIZE_CATALOG_FILE)
+
+    # Loads the save file (migrating an old save-file.json), replaying anything journaled after the last save
+    save_journal = SaveJournal(SAVE_FILE, SAVE_CHECKPOINT_EVENTS, SAVE_CHECKPOINT_SECONDS, read_only=bool(args.replay),
+                               catalog_sections=catalog_sections)
+    data = input_log.load_save_data(save_journal)
+    save_journal.start(data)
+
+    # The machine: its own physics space, claw, balls (positions and angles kept as arrays) and prizes
+    # The balls start where they were left, or from a settled pile on a fresh day, instead of spawning one by one
+    timestep = FixedTimestep(PHYSICS_RATE, PHYSICS_SUBSTEPS, MAX_STEPS_PER_FRAME)
+    cabinet = Cabinet(SCREEN_WIDTH, (claw_pieces_close_list, claw_pieces_open_list), save_journal, data, catalog_sections,
+                      timestep, rng=np.random.default_rng(input_log.seed), layouts=load_layouts(PILE_LAYOUTS_FILE))
+
+    # Flat index of the prizes for picking and marking prizes without walking the nested sections
+    prize_catalog = cabinet.prize_catalog
+
+    # Initializes the clock for timers
+    clock = pygame.time.Clock()
+
+    # Per-phase frame timings (F3 shows them on screen)
+    profiler = FrameProfiler(enabled=PROFILE_FRAMES)
+
+    # Picks the physics quality preset from the step times, logging every switch (a replay switches where the recording did)
+    governor = PhysicsGovernor(PHYSICS_BUDGET_MS, PHYSICS_PRESET, "game", enabled=not args.replay)
+
+    # Run the game loop
+    try:
+        game_loop()
+    except ReplayDesync as error:
+        pygame.quit()
+        parser.exit(1, "Replay stopped, the game no longer follows %s: %s\n" % (args.replay, error))
@@ -0,0 +1,93 @@
+from gacha_ball import GachaBall
+
+# Physics quality presets, best first: solver iterations, space.step calls per fixed step, spatial hash cell size
+# (pixels) and the sleep thresholds (seconds a ball must stay slow, and how slow, before it sleeps)
+PRESETS = (
+    {"name": "high", "iterations": 20, "substeps": 2, "cell_size": GachaBall.RADIUS * 2, "sleep_time": 0.5, "idle_speed": 10},
+    {"name": "normal", "iterations": 10, "substeps": 1, "cell_size": GachaBall.RADIUS * 2, "sleep_time": 0.5, "idle_speed": 10},
+    {"name": "low", "iterations": 6, "substeps": 1, "cell_size": GachaBall.RADIUS * 3, "sleep_time": 0.3, "idle_speed": 15},
+    {"name": "minimal", "iterations": 4, "substeps": 1, "cell_size": GachaBall.RADIUS * 4, "sleep_time": 0.1, "idle_speed": 25},
+)
+PRESET_NAMES = [preset["name"] for preset in PRESETS]
+DEFAULT_PRESET = "normal"  # The preset create_space sets up
+HASH_CELLS = 2000  # Spatial hash size of every preset
+
+# Switches a physics space and its fixed timestep to a preset (without a timestep the substeps are left to the caller)
+def apply_preset(space, timestep, preset):
+    space.iterations = preset["iterations"]
+    space.use_spatial_hash(preset["cell_size"], HASH_CELLS)
+    space.sleep_time_threshold = preset["sleep_time"]
+    space.idle_speed_threshold = preset["idle_speed"]
+    if timestep is not None:
+        timestep.substeps = preset["substeps"]
+
+# Watches how long the physics takes per frame and steps down a preset when it runs over budget, back up when it
+# has plenty of room again
+class PhysicsGovernor:
+    # Constants declaration
+    WINDOW = 30  # Frames with physics averaged before each decision
+    UPGRADE_FRACTION = 0.5  # Room needed to step back up: physics under this share of the budget...
+    UPGRADE_WINDOWS = 4  # ...for this many windows in a row (doubled whenever a step up had to be undone, back to this
+                         # once the best preset has held for as long as the last wait)
+    MAX_UPGRADE_WINDOWS = 64
+
+    def __init__(self, budget_ms, best=DEFAULT_PRESET, name="cabinet", enabled=True, log=print):
+        self.budget = budget_ms / 1000  # Seconds of physics allowed per frame
+        self.best = PRESET_NAMES.index(best)  # Highest quality the governor may use, and where it starts
+        self.level = self.best  # Index of the preset in use
+        self.name = name  # Shown in the log
+        self.enabled = enabled  # Off when replaying, the recording says when to switch
+        self.log = log
+        self.samples = []  # Seconds of physics per frame in the current window
+        self.room_windows = 0  # Windows in a row with room to step up
+        self.upgrade_windows = self.UPGRADE_WINDOWS  # Windows of room needed before stepping up
+        self.stable_windows = 0  # Windows in a row at the best preset within budget
+        self.frames = 0
+        self.switches = []  # (frame, old preset, new preset, reason) of every switch
+
+    # Adds the physics time of a frame that stepped the space, returns the preset index to use from now on
+    def frame(self, physics_time, ball_count):
+        if not self.enabled:
+            return self.level
+        self.frames += 1
+        self.samples.append(physics_time)
+        if len(self.samples) < self.WINDOW:
+            return self.level
+
+        average = sum(self.samples) / len(self.samples)
+        peak = max(self.samples)
+        self.samples = []
+        usage = "physics averaged %.2f ms per frame (peak %.2f ms, budget %.2f ms) with %d balls" % (
+            average * 1000, peak * 1000, self.budget * 1000, ball_count)
+
+        if average > self.budget:
+            self.room_windows = 0
+            self.stable_windows = 0
+            if self.level < len(PRESETS) - 1:
+                # Undoing a step up makes the next one wait longer, so a load that keeps coming back doesn't flip-flop
+                if self.switches and self.switches[-1][1] == PRESET_NAMES[self.level + 1]:
+                    self.upgrade_windows = min(self.upgrade_windows * 2, self.MAX_UPGRADE_WINDOWS)
+                self.switch(self.level + 1, usage)
+        elif average < self.budget * self.UPGRADE_FRACTION and self.level > self.best:
+            self.room_windows += 1
+            if self.room_windows >= self.upgrade_windows:
+                self.room_windows = 0
+                self.switch(self.level - 1, usage)
+        else:
+            self.room_windows = 0
+            if self.level == self.best:
+                self.stable_windows += 1
+                if self.stable_windows >= self.upgrade_windows:
+                    self.upgrade_windows = self.UPGRADE_WINDOWS
+        return self.level
+
+    def switch(self, level, reason):
+        old, new = PRESET_NAMES[self.level], PRESET_NAMES[level]
+        self.switches.append((self.frames, old, new, reason))
+        self.log("%s: physics quality %s -> %s, %s" % (self.name, old, new, reason))
+        self.level = level
+
+    # How many switches went down and up
+    def summary(self):
+        downgrades = sum(1 for _, old, new, _ in self.switches if PRESET_NAMES.index(new) > PRESET_NAMES.index(old))
+        return downgrades, len(self.switches) - downgrades
@@ -0,0 +1,119 @@
+import queue
+import threading
+import numpy as np
+
+# What the render loop draws for one frame: the claw and ball transforms between the last two physics steps, and the HUD
+# state (published once and never changed, the arrays are read-only views into one of the two snapshot buffers)
+class PhysicsSnapshot:
+    __slots__ = ("positions", "angles", "claw_position", "claw_angle", "claw_state", "claw_frame", "claw_shapes", "coins",
+                 "left_pressed", "right_pressed", "spawning", "resting", "prizes", "physics_time", "claw_time",
+                 "shape_ops")
+
+    def __init__(self, cabinet, positions, angles, prizes, physics_time, claw_time):
+        claw = cabinet.claw
+        self.positions = positions
+        self.angles = angles
+        self.claw_position = tuple(claw.interpolated_position(cabinet.timestep.alpha()))
+        self.claw_angle = claw.body.angle
+        self.claw_state = claw.state
+        self.claw_frame = claw.current_frame
+        self.claw_shapes = claw.shapes  # Tuple of the shapes in the space, for the F4 outlines
+        self.coins = cabinet.coins
+        self.left_pressed = cabinet.left_pressed
+        self.right_pressed = cabinet.right_pressed
+        self.spawning = cabinet.spawned < cabinet.DAILY_BALLS  # Balls left to spawn today
+        self.resting = cabinet.resting()
+        self.prizes = tuple(prizes)  # IDs of the prizes won during the frame
+        self.physics_time = physics_time  # Seconds spent stepping the space during the frame
+        self.claw_time = claw_time  # Seconds spent running the claw (descending, grabbing, swapping shapes) during the frame
+        self.shape_ops = claw.shape_ops.per_second()  # Claw shapes added to and removed from the space per second
+
+# Steps a cabinet on a worker thread: the game loop queues each frame's commands and draws the snapshot of the frame
+# before while the worker simulates the next one
+class PhysicsThread:
+    # Constants declaration
+    BUFFERS = 2  # Snapshots alternate between two sets of arrays, the render loop reads one while the worker fills the other
+
+    def __init__(self, cabinet, threaded=True):
+        self.cabinet = cabinet  # Only touched by the worker once it runs, the game loop reads the snapshots
+        self.threaded = threaded  # Off steps the frames inline in submit(), with the same results
+        capacity = len(cabinet.gacha_prizes.positions)
+        self.buffers = [(np.zeros((capacity, 2)), np.zeros(capacity)) for _ in range(self.BUFFERS)]
+        self.published = 0  # Snapshots written so far, picks the buffer of the next one
+        self.commands = queue.Queue()  # (frame time, commands, preset index) per frame, None to stop
+        self.snapshots = queue.Queue()  # Snapshots of the submitted frames, in order
+        self.pending = 0  # Frames submitted but not collected yet
+        self.snapshot = self.publish([], 0.0, 0.0)  # The cabinet as it starts
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self.run, name="physics", daemon=True)
+            self.thread.start()
+
+    # Hands a frame's commands to the worker, its snapshot comes back from collect()
+    def submit(self, frame_time, commands, level):
+        self.pending += 1
+        if self.threaded:
+            self.commands.put((frame_time, commands, level))
+        else:
+            self.snapshots.put(self.step(frame_time, commands, level))
+
+    # Waits for the oldest submitted frame and returns its snapshot (the latest one again if nothing is pending)
+    # The worker is idle from here until the next submit, so the cabinet can be read in between (shelf, popups)
+    # An error raised while stepping on the worker is raised again here, on the game loop's thread
+    def collect(self):
+        if self.pending:
+            snapshot = self.snapshots.get()
+            self.pending -= 1
+            if isinstance(snapshot, Exception):
+                raise snapshot
+            self.snapshot = snapshot
+        return self.snapshot
+
+    # Stops at the first error, handing it to collect() instead of a snapshot (the cabinet can't be stepped any further)
+    def run(self):
+        while True:
+            frame = self.commands.get()
+            if frame is None:
+                return
+            try:
+                snapshot = self.step(*frame)
+            except Exception as error:
+                self.snapshots.put(error)
+                return
+            self.snapshots.put(snapshot)
+
+    # Applies the commands, runs the fixed steps the frame time covers and publishes the result
+    def step(self, frame_time, commands, level):
+        cabinet = self.cabinet
+        if level != cabinet.quality:
+            cabinet.set_quality(level)
+        for command in commands:
+            cabinet.apply(command)
+        prizes = cabinet.advance(frame_time)
+        physics_time, cabinet.physics_time = cabinet.physics_time, 0.0
+        claw_time, cabinet.claw_time = cabinet.claw_time, 0.0
+        return self.publish(prizes, physics_time, claw_time)
+
+    # Copies the interpolated ball transforms into the buffer the render loop is not reading
+    def publish(self, prizes, physics_time, claw_time):
+        cabinet = self.cabinet
+        slot = self.published % self.BUFFERS
+        self.published += 1
+        positions_buffer, angles_buffer = self.buffers[slot]
+        count = len(cabinet.gacha_prizes)
+        if count > len(angles_buffer):
+            positions_buffer, angles_buffer = self.buffers[slot] = (np.zeros((count * 2, 2)), np.zeros(count * 2))
+        positions, angles = cabinet.gacha_prizes.interpolated(cabinet.timestep.alpha())
+        positions_buffer[:count] = positions
+        angles_buffer[:count] = angles
+        positions, angles = positions_buffer[:count], angles_buffer[:count]
+        positions.flags.writeable = False  # Only the views are locked, the worker writes through the buffer
+        angles.flags.writeable = False
+        return PhysicsSnapshot(cabinet, positions, angles, prizes, physics_time, claw_time)
+
+    # Finishes the frames already submitted and stops the worker
+    def close(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.commands.put(None)
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,21 @@
+import json
+
+# Library of settled ball piles, so a fresh day starts with a full machine instead of 10 seconds of spawning
+# (built offline by build_pile_layouts.py)
+PILE_LAYOUTS_FILE = "pile-layouts.json"
+
+# Returns {ball count: [layout, ...]}, each layout a list of GachaBall states (empty if the library is missing)
+def load_layouts(filename=PILE_LAYOUTS_FILE):
+    try:
+        with open(filename, 'r') as file:
+            library = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return {int(count): layouts for count, layouts in library["layouts"].items()}
+
+# Picks one of the settled layouts with the given number of balls (None if the library has none)
+def pick_layout(layouts, ball_count, rng):
+    variants = layouts.get(ball_count)
+    if not variants:
+        return None
+    return variants[int(rng.integers(len(variants)))]
@@ -0,0 +1,93 @@
+import json
+import random
+
+# Every prize of the game: section -> subsection -> key -> image path (shared by all players, new prizes go at the end)
+PRIZE_CATALOG_FILE = "prize-catalog.json"
+
+def load_catalog(filename=PRIZE_CATALOG_FILE):
+    with open(filename, 'r') as file:
+        return json.load(file)
+
+# Maps (section, subsection, key) to the prize ID, which is the prize's position in the catalog
+def prize_ids(catalog_sections):
+    ids = {}
+    for section, subsections in catalog_sections.items():
+        for subsection, prizes in subsections.items():
+            for key in prizes:
+                ids[(section, subsection, key)] = len(ids)
+    return ids
+
+class PrizeCatalog:
+    def __init__(self, catalog_sections, won=None):
+        self.won = won if won is not None else bytearray()  # Bitset of won prize IDs (the save data's, marked in place)
+        self.sections = {}  # Section -> subsection -> prize IDs, in catalog order
+        self.prizes = []  # Flat list of (section, subsection, key, image path), the prize ID is the position
+        self.ids = {}  # (section, subsection, key) -> prize ID
+        self.unwon = []  # IDs of the prizes not won yet, in no particular order
+        self.unwon_slot = []  # Prize ID -> its position in self.unwon (-1 once won)
+        self.section_won = {}  # Section -> (won, total)
+        self.subsection_won = {}  # (section, subsection) -> (won, total)
+
+        # Saves from before the catalog grew have fewer bits, the new prizes start out unwon
+        prize_count = sum(len(prizes) for subsections in catalog_sections.values() for prizes in subsections.values())
+        if len(self.won) * 8 < prize_count:
+            self.won.extend(bytes((prize_count + 7) // 8 - len(self.won)))
+
+        for section, subsections in catalog_sections.items():
+            for subsection, prizes in subsections.items():
+                for key, image in prizes.items():
+                    self.add(section, subsection, key, image)
+
+    def add(self, section, subsection, key, image):
+        prize_id = len(self.prizes)
+        self.prizes.append((section, subsection, key, image))
+        self.ids[(section, subsection, key)] = prize_id
+        self.sections.setdefault(section, {}).setdefault(subsection, []).append(prize_id)
+        won = 1 if self.is_won(prize_id) else 0
+        if won:
+            self.unwon_slot.append(-1)
+        else:
+            self.unwon_slot.append(len(self.unwon))
+            self.unwon.append(prize_id)
+
+        section_won, section_total = self.section_won.get(section, (0, 0))
+        self.section_won[section] = (section_won + won, section_total + 1)
+        subsection_won, subsection_total = self.subsection_won.get((section, subsection), (0, 0))
+        self.subsection_won[(section, subsection)] = (subsection_won + won, subsection_total + 1)
+
+    def __len__(self):
+        return len(self.prizes)
+
+    def get(self, prize_id): # Returns (section, subsection, key, image path)
+        return self.prizes[prize_id]
+
+    def image(self, prize_id):
+        return self.prizes[prize_id][3]
+
+    def is_won(self, prize_id):
+        return bool(self.won[prize_id >> 3] & (1 << (prize_id & 7)))
+
+    # Picks a random prize that has not been won yet (None once everything is won)
+    def random_unwon(self, rng=random):
+        if not self.unwon:
+            return None
+        return self.unwon[rng.randrange(len(self.unwon))]
+
+    # Marks a prize as won, swapping the last unwon prize into its slot so nothing has to shift
+    def mark_won(self, prize_id):
+        slot = self.unwon_slot[prize_id]
+        if slot < 0:
+            return self.prizes[prize_id]  # Already won
+        last_id = self.unwon.pop()
+        if last_id != prize_id:
+            self.unwon[slot] = last_id
+            self.unwon_slot[last_id] = slot
+        self.unwon_slot[prize_id] = -1
+
+        section, subsection, key, image = self.prizes[prize_id]
+        self.won[prize_id >> 3] |= 1 << (prize_id & 7)
+        section_won, section_total = self.section_won[section]
+        self.section_won[section] = (section_won + 1, section_total)
+        subsection_won, subsection_total = self.subsection_won[(section, subsection)]
+        self.subsection_won[(section, subsection)] = (subsection_won + 1, subsection_total)
+        return self.prizes[prize_id]
@@ -0,0 +1,91 @@
+import pygame
+
+class LayeredRenderer:
+    def __init__(self, screen, static_layer, full_flip=False):
+        self.screen = screen
+        self.static_layer = static_layer  # Pre-composited background that never changes
+        self.full_flip = full_flip  # Redraw and flip the whole window every frame (for comparison)
+        self.widgets = {}  # HUD and button images this frame: name -> (surface, rect)
+        self.previous_widgets = {}
+        self.sprites = []  # Moving sprites this frame, in drawing order: (surface, (x, y))
+        self.previous_sprites = set()
+        self.last_sprites = []  # Sprites of the last frame, in drawing order
+        self.full_redraw = True  # Next frame must redraw everything (first frame, after an overlay)
+        self.updated_area = 0  # Pixels pushed to the display by the last frame
+
+    # Forces the next frame to redraw the whole window (after the shelf or a popup drew over it)
+    def invalidate(self):
+        self.full_redraw = True
+
+    # Sets a HUD element or button image (redrawn only when it changes)
+    def set_widget(self, name, surface, topleft):
+        self.widgets[name] = (surface, surface.get_rect(topleft=topleft))
+
+    # Adds a moving sprite for this frame
+    def add_sprite(self, surface, topleft):
+        self.sprites.append((surface, (int(topleft[0]), int(topleft[1]))))
+
+    def add_sprites(self, placements):
+        for surface, topleft in placements:
+            self.sprites.append((surface, (int(topleft[0]), int(topleft[1]))))
+
+    # Keeps the sprites of the last frame (nothing moved since)
+    def reuse_sprites(self):
+        self.sprites = self.last_sprites
+
+    # Draws the frame and pushes only the parts of the window that changed
+    def present(self):
+        if self.full_flip or self.full_redraw:
+            self.screen.blit(self.static_layer, (0, 0))
+            for surface, rect in self.widgets.values():
+                self.screen.blit(surface, rect)
+            self.screen.blits(self.sprites, doreturn=False)
+            pygame.display.flip()
+            self.updated_area = self.screen.get_width() * self.screen.get_height()
+            self.full_redraw = False
+        else:
+            self.present_dirty()
+
+        self.previous_widgets = self.widgets
+        self.widgets = {}
+        self.previous_sprites = set(self.sprites)
+        self.last_sprites = self.sprites
+        self.sprites = []
+
+    def present_dirty(self):
+        dirty = []
+
+        # HUD elements and buttons whose image or position changed
+        for name, (surface, rect) in self.widgets.items():
+            previous = self.previous_widgets.get(name)
+            if previous is None or previous[0] is not surface or previous[1] != rect:
+                dirty.append(rect)
+                if previous is not None:
+                    dirty.append(previous[1])
+        for name, (_, rect) in self.previous_widgets.items():
+            if name not in self.widgets:
+                dirty.append(rect)
+
+        # Sprites that moved, changed image, appeared or disappeared
+        current_sprites = set(self.sprites)
+        for surface, topleft in current_sprites.symmetric_difference(self.previous_sprites):
+            dirty.append(surface.get_rect(topleft=topleft))
+
+        self.updated_area = 0
+        if not dirty:
+            return  # Nothing changed, the last frame is still on screen
+
+        # Recompose each dirty area from the static layer up, clipped so nothing outside it is touched
+        widgets = list(self.widgets.values())
+        widget_rects = [rect for _, rect in widgets]
+        sprite_rects = [surface.get_rect(topleft=topleft) for surface, topleft in self.sprites]
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.screen.blit(self.static_layer, rect, rect)
+            for index in rect.collidelistall(widget_rects):
+                self.screen.blit(*widgets[index])
+            for index in rect.collidelistall(sprite_rects):
+                self.screen.blit(*self.sprites[index])
+            self.updated_area += rect.width * rect.height
+        self.screen.set_clip(None)
+        pygame.display.update(dirty)
@@ -0,0 +1,101 @@
+import json
+import struct
+from datetime import datetime, timedelta
+
+from prize_catalog import prize_ids
+
+# Compact save file: a fixed header, then the won flags as a bitset indexed by prize ID (position in the catalog),
+# then (since version 2) the balls left in the machine
+SAVE_FILE = "save-file.sav"
+MAGIC = b"GACHASAV"
+VERSION = 2
+HEADER = struct.Struct("<8sHHiiqI")  # Magic, version, reserved, coins, gacha balls, saved at, length of the bitset in bytes
+PILE_COUNT = struct.Struct("<I")  # Balls in the machine
+BALL = struct.Struct("<6dB")  # x, y, angle, velocity x, velocity y, angular velocity, asleep (see GachaBall.state)
+EPOCH = datetime(1970, 1, 1)  # Save times are local like before, stored as microseconds after this
+
+class SaveData:
+    __slots__ = ("saved_at", "coins", "balls", "won", "pile")
+
+    def __init__(self, saved_at, coins, balls, won=b"", pile=()):
+        self.saved_at = saved_at  # When the game was last saved
+        self.coins = coins
+        self.balls = balls  # Gacha balls left for the day (in the machine or still to spawn)
+        self.won = bytearray(won)  # Bit (id % 8) of byte (id // 8) is set once the prize is won
+        self.pile = list(pile)  # State of every ball in the machine when the game closed (empty for checkpoints)
+
+    def is_won(self, prize_id):
+        byte = prize_id >> 3
+        return byte < len(self.won) and bool(self.won[byte] & (1 << (prize_id & 7)))
+
+    def set_won(self, prize_id):
+        byte = prize_id >> 3
+        if byte >= len(self.won):
+            self.won.extend(bytes(byte + 1 - len(self.won)))
+        self.won[byte] |= 1 << (prize_id & 7)
+
+    def copy(self):
+        return SaveData(self.saved_at, self.coins, self.balls, self.won, self.pile)
+
+    def to_bytes(self):
+        saved_at = (self.saved_at - EPOCH) // timedelta(microseconds=1)
+        return (HEADER.pack(MAGIC, VERSION, 0, self.coins, self.balls, saved_at, len(self.won)) + bytes(self.won)
+                + pile_to_bytes(self.pile))
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("save file is truncated")
+        magic, version, _, coins, balls, saved_at, won_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a save file")
+        if version > VERSION:
+            raise ValueError("save file version %d is newer than this game (%d)" % (version, VERSION))
+        won = data[HEADER.size:HEADER.size + won_length]
+        if len(won) != won_length:
+            raise ValueError("save file is truncated")
+        pile = pile_from_bytes(data[HEADER.size + won_length:]) if version >= 2 else []
+        return cls(EPOCH + timedelta(microseconds=saved_at), coins, balls, won, pile)
+
+    # Plain JSON values (used to embed the save in session recordings)
+    def to_dict(self):
+        return {"saved_at": self.saved_at.isoformat(), "coins": self.coins, "balls": self.balls, "won": self.won.hex(),
+                "pile": pile_to_bytes(self.pile).hex()}
+
+def pile_to_bytes(pile):
+    return PILE_COUNT.pack(len(pile)) + b"".join(BALL.pack(*ball) for ball in pile)
+
+def pile_from_bytes(data):
+    if len(data) < PILE_COUNT.size:
+        raise ValueError("save file is truncated")
+    count, = PILE_COUNT.unpack_from(data, 0)
+    if len(data) < PILE_COUNT.size + count * BALL.size:
+        raise ValueError("save file is truncated")
+    return [BALL.unpack_from(data, PILE_COUNT.size + index * BALL.size) for index in range(count)]
+
+def read_save(filename=SAVE_FILE):
+    with open(filename, 'rb') as file:
+        return SaveData.from_bytes(file.read())
+
+# Converts the old JSON save (every prize with its image path and won flag) to the compact format
+def migrate_legacy(game_data, catalog_sections):
+    save_data = SaveData(datetime.fromisoformat(game_data["Last Saved DateTime"]), game_data["Coins"], game_data["Gacha Balls"])
+    ids = prize_ids(catalog_sections)
+    for section, subsections in game_data.get("Prizes", {}).items():
+        for subsection, prizes in subsections.items():
+            for key, prize in prizes.items():
+                prize_id = ids.get((section, subsection, key))
+                if prize["won"] and prize_id is not None:  # Prizes since dropped from the catalog are left out
+                    save_data.set_won(prize_id)
+    return save_data
+
+def read_legacy_save(filename, catalog_sections):
+    with open(filename, 'r') as file:
+        return migrate_legacy(json.load(file), catalog_sections)
+
+# Reads a save from to_dict() values, or from an old JSON save's values
+def save_from_dict(values, catalog_sections):
+    if "Prizes" in values:
+        return migrate_legacy(values, catalog_sections)
+    pile = pile_from_bytes(bytes.fromhex(values["pile"])) if "pile" in values else []
+    return SaveData(datetime.fromisoformat(values["saved_at"]), values["coins"], values["balls"], bytes.fromhex(values["won"]), pile)
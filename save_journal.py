@@ -0,0 +1,185 @@
+import os
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+from save_format import SAVE_FILE, read_save, read_legacy_save
+from prize_catalog import prize_ids
+
+# Saves the game progress into the save file (written to a temporary file first, then swapped in atomically)
+def save_game_data(save_data, filename=SAVE_FILE):
+    temp_file = filename + '.tmp'
+    with open(temp_file, 'wb') as file:
+        file.write(save_data.to_bytes())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file, filename)
+
+# Applies one journal event to the save data (events carry absolute values, so replaying one twice is harmless)
+def apply_event(save_data, event, ids=None):
+    if event["type"] in ("coin_spent", "coin_earned"):
+        save_data.coins = event["coins"]
+    elif event["type"] == "ball_grabbed":
+        save_data.balls = event["balls"]
+    elif event["type"] == "day_started":
+        save_data.coins = event["coins"]
+        save_data.balls = event["balls"]
+    elif event["type"] == "prize_won":
+        if "prize" in event:
+            save_data.set_won(event["prize"])
+        else:
+            save_data.set_won(ids[(event["section"], event["subsection"], event["key"])])  # Journaled before the compact format
+    save_data.saved_at = datetime.fromisoformat(event["time"])
+
+class SaveJournal:
+    # Constants declaration
+    DEFAULT_CHECKPOINT_EVENTS = 20  # Compact the journal after this many events
+    DEFAULT_CHECKPOINT_INTERVAL = 30.0  # Or after this many seconds with unsaved events
+
+    def __init__(self, filename=SAVE_FILE, checkpoint_events=DEFAULT_CHECKPOINT_EVENTS,
+                 checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, read_only=False, catalog_sections=None):
+        self.filename = filename
+        self.read_only = read_only  # Loads but never writes (used when replaying a recorded session)
+        self.catalog_sections = catalog_sections  # Prize catalog, to migrate saves and journals from the old JSON format
+        self.journal_filename = os.path.splitext(filename)[0] + '.journal'
+        self.legacy_filename = os.path.splitext(filename)[0] + '.json'
+        self.checkpoint_events = checkpoint_events
+        self.checkpoint_interval = checkpoint_interval
+        self.queue = queue.Queue()
+        self.thread = None
+        self.state = None  # Writer's own copy of the game data, only touched by the writer thread
+        self.events_since_checkpoint = 0
+        self.last_checkpoint = time.monotonic()
+
+    # Loads the last snapshot (migrating an old JSON save the first time) and replays the events journaled after it
+    def load(self):
+        if os.path.exists(self.filename) or self.catalog_sections is None:
+            save_data = read_save(self.filename)
+        else:
+            save_data = read_legacy_save(self.legacy_filename, self.catalog_sections)
+        events = self.read_journal()
+        ids = None
+        if any(event["type"] == "prize_won" and "prize" not in event for event in events):
+            ids = prize_ids(self.catalog_sections)
+        for event in events:
+            apply_event(save_data, event, ids)
+        return save_data
+
+    def read_journal(self):
+        events = []
+        try:
+            with open(self.journal_filename, 'r') as file:
+                for line in file:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        break  # Torn last line from a crash, everything before it is intact
+        except OSError:
+            pass
+        return events
+
+    # Cuts a torn last line off the journal, so events appended after it aren't merged into it and lost on the next load
+    # Returns the number of events kept
+    def trim_journal(self):
+        try:
+            with open(self.journal_filename, 'rb+') as file:
+                data = file.read()
+                kept = 0
+                size = 0  # Bytes up to the end of the last intact event
+                for line in data.split(b"\n"):
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        break
+                    kept += 1
+                    size += len(line) + 1
+                file.truncate(min(size, len(data)))
+                if size > len(data):
+                    file.seek(len(data))
+                    file.write(b"\n")  # Torn just before its newline, the event itself is intact
+        except OSError:
+            return 0
+        return kept
+
+    # Starts the background writer from the loaded save data
+    def start(self, save_data):
+        if self.read_only:
+            return
+        self.state = save_data.copy()
+        self.state.pile = []  # Checkpoints don't know where the balls are, only the final snapshot does
+        if not os.path.exists(self.filename):
+            save_game_data(self.state, self.filename)  # Migrated from the old JSON save, write it in the new format right away
+        self.events_since_checkpoint = self.trim_journal()
+        self.thread = threading.Thread(target=self.run, name="save-journal", daemon=True)
+        self.thread.start()
+
+    # Queues an event for the writer (never blocks the game loop)
+    def record(self, event_type, **values):
+        if self.read_only:
+            return
+        values["type"] = event_type
+        values["time"] = datetime.now().isoformat()
+        self.queue.put(values)
+
+    # Writes a final snapshot and stops the writer
+    def close(self, save_data):
+        if self.read_only:
+            return
+        self.queue.put(("close", save_data.copy()))
+        self.thread.join()
+
+    def run(self):
+        with open(self.journal_filename, 'a') as journal:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.checkpoint_interval)
+                except queue.Empty:
+                    item = None
+
+                # Write everything that is waiting in one go
+                batch = [] if item is None else [item]
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                closing = None
+                events = []
+                for entry in batch:
+                    if isinstance(entry, tuple):
+                        closing = entry[1]
+                    else:
+                        events.append(entry)
+
+                if events:
+                    journal.write("".join(json.dumps(event) + "\n" for event in events))
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    for event in events:
+                        apply_event(self.state, event)
+                    self.events_since_checkpoint += len(events)
+
+                if closing is not None:
+                    self.checkpoint(journal, closing)
+                    return
+                if self.checkpoint_due():
+                    self.checkpoint(journal, self.state)
+
+    def checkpoint_due(self):
+        if self.events_since_checkpoint == 0:
+            return False
+        return (self.events_since_checkpoint >= self.checkpoint_events
+                or time.monotonic() - self.last_checkpoint >= self.checkpoint_interval)
+
+    # Replaces the snapshot atomically, then empties the journal
+    def checkpoint(self, journal, save_data):
+        save_game_data(save_data, self.filename)
+        journal.truncate(0)
+        journal.seek(0)
+        journal.flush()
+        os.fsync(journal.fileno())
+        self.events_since_checkpoint = 0
+        self.last_checkpoint = time.monotonic()
@@ -0,0 +1,42 @@
+import threading
+
+# Composited shelf pages, kept until what they show changes (a prize of their section is won)
+class ShelfPages:
+    def __init__(self):
+        self.pages = {}  # Page key -> (version it was drawn at, surface)
+        self.lock = threading.Lock()  # Pages draw with the shared text and image caches, one page at a time
+        self.prefetcher = None  # Background thread drawing the pages the player is likely to open next
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the page, calling draw() only if it was never drawn or its version changed since
+    def get(self, key, version, draw):
+        with self.lock:
+            return self.page(key, version, draw)
+
+    def page(self, key, version, draw):
+        cached = self.pages.get(key)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        surface = draw()
+        self.pages[key] = (version, surface)
+        return surface
+
+    # Draws the given pages ((key, version, draw) each) on a background thread so switching to them is instant
+    def prefetch(self, pages):
+        self.wait()
+        self.prefetcher = threading.Thread(target=self.prefetch_pages, args=(pages,), name="shelf-pages", daemon=True)
+        self.prefetcher.start()
+
+    def prefetch_pages(self, pages):
+        for key, version, draw in pages:
+            with self.lock:
+                self.page(key, version, draw)
+
+    # Waits for the background drawing to finish (the game shares the caches it draws with)
+    def wait(self):
+        if self.prefetcher is not None:
+            self.prefetcher.join()
+            self.prefetcher = None
@@ -0,0 +1,158 @@
+import os
+import json
+import random
+import argparse
+import multiprocessing
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from main import SCREEN_WIDTH, PHYSICS_RATE, PHYSICS_SUBSTEPS, CLAW_MAX_VERTICES, CLAW_CONCAVE
+from cabinet import create_space
+from claw import Claw
+from gacha_ball import GachaBall
+from claw_hull import load_claw_pieces
+from timestep import FixedTimestep
+
+# Headless drop simulator: plays scripted claw grabs without a display to measure payout rates
+#   python simulate.py --balls 10 20 --grab-chance 0.5 1 --trials 5000
+
+SPAWN_INTERVAL = 0.5  # Seconds between spawned balls, like the spawn_event timer
+SETTLE_TIME = 3.0  # Seconds to let the pile settle after filling the machine
+REFILL_SETTLE_TIME = 1.0  # Seconds to let a replacement ball settle after a successful grab
+MAX_GRAB_TIME = 10.0  # Give up on a grab that never returns (should not happen)
+X_RANGE = (100, SCREEN_WIDTH - 100)  # Where the claw can be moved in the game
+
+claw_pieces = None  # Per-worker copy of the claw's convex pieces (close list, open list)
+
+def init_worker(pieces):
+    global claw_pieces
+    claw_pieces = pieces
+
+# Runs the physics for the given number of seconds, returns True if the claw brought a ball up
+def run_for(space, claw, gacha_prizes, timestep, seconds):
+    grabbed = False
+    for _ in range(int(round(seconds / timestep.dt))):
+        grabbed = claw.step(gacha_prizes, timestep.dt) or grabbed
+        timestep.step_space(space)
+    return grabbed
+
+# Plays one grab at the claw's current position until the claw is idle again
+def play_grab(space, claw, gacha_prizes, timestep):
+    claw.state = "descending"
+    for _ in range(int(round(MAX_GRAB_TIME / timestep.dt))):
+        if claw.step(gacha_prizes, timestep.dt):
+            timestep.step_space(space)
+            return True
+        timestep.step_space(space)
+        if claw.state == "idle":
+            break
+    return False
+
+# One seeded simulation: fills a machine, then plays grabs at random claw positions
+def run_simulation(task):
+    ball_count, grab_chance, seed, trials, bucket_width = task
+    random.seed(seed)
+
+    space = create_space()
+    timestep = FixedTimestep(PHYSICS_RATE, PHYSICS_SUBSTEPS)
+    claw = Claw(SCREEN_WIDTH, space, *claw_pieces)
+    claw.GRAB_CHANCE = grab_chance
+    gacha_prizes = []
+
+    # Fill the machine the same way the game does
+    for _ in range(ball_count):
+        gacha_prizes.append(GachaBall(space))
+        run_for(space, claw, gacha_prizes, timestep, SPAWN_INTERVAL)
+    run_for(space, claw, gacha_prizes, timestep, SETTLE_TIME)
+
+    attempts = {}
+    successes = {}
+    for _ in range(trials):
+        claw.x = random.uniform(*X_RANGE)
+        bucket = int((claw.x - X_RANGE[0]) // bucket_width)
+        won = play_grab(space, claw, gacha_prizes, timestep)
+        attempts[bucket] = attempts.get(bucket, 0) + 1
+        if won:
+            successes[bucket] = successes.get(bucket, 0) + 1
+            # Put a ball back so every grab sees the same number of balls
+            gacha_prizes.append(GachaBall(space))
+            run_for(space, claw, gacha_prizes, timestep, REFILL_SETTLE_TIME)
+
+    return ball_count, grab_chance, attempts, successes
+
+# Builds one task per seeded simulation, splitting the trials of each configuration between runs
+def build_tasks(ball_counts, grab_chances, trials, runs, seed, bucket_width):
+    tasks = []
+    for ball_count in ball_counts:
+        for grab_chance in grab_chances:
+            for run in range(runs):
+                run_trials = trials // runs + (1 if run < trials % runs else 0)
+                tasks.append((ball_count, grab_chance, seed + len(tasks), run_trials, bucket_width))
+    return tasks
+
+# Adds up the per-run counts into success rates per ball count, grab chance and X bucket
+def summarize(results, bucket_width):
+    totals = {}
+    for ball_count, grab_chance, attempts, successes in results:
+        buckets = totals.setdefault((ball_count, grab_chance), {})
+        for bucket, count in attempts.items():
+            entry = buckets.setdefault(bucket, [0, 0])
+            entry[0] += count
+            entry[1] += successes.get(bucket, 0)
+
+    summary = []
+    for (ball_count, grab_chance), buckets in sorted(totals.items()):
+        total_attempts = sum(a for a, _ in buckets.values())
+        total_successes = sum(s for _, s in buckets.values())
+        summary.append({
+            "balls": ball_count,
+            "grab_chance": grab_chance,
+            "attempts": total_attempts,
+            "success_rate": total_successes / total_attempts if total_attempts else 0.0,
+            "buckets": [
+                {
+                    "x_min": X_RANGE[0] + bucket * bucket_width,
+                    "x_max": min(X_RANGE[1], X_RANGE[0] + (bucket + 1) * bucket_width),
+                    "attempts": attempts,
+                    "success_rate": successes / attempts,
+                }
+                for bucket, (attempts, successes) in sorted(buckets.items())
+            ],
+        })
+    return summary
+
+def print_summary(summary):
+    for entry in summary:
+        print("balls=%d grab_chance=%.2f attempts=%d success=%.1f%%" % (
+            entry["balls"], entry["grab_chance"], entry["attempts"], entry["success_rate"] * 100))
+        for bucket in entry["buckets"]:
+            print("    x %3d-%3d  %5d grabs  %5.1f%%" % (
+                bucket["x_min"], bucket["x_max"], bucket["attempts"], bucket["success_rate"] * 100))
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate claw grabs without a display to measure payout rates.")
+    parser.add_argument("--balls", type=int, nargs="+", default=[20], help="ball counts to simulate")
+    parser.add_argument("--grab-chance", type=float, nargs="+", default=[Claw.GRAB_CHANCE], help="GRAB_CHANCE values to simulate")
+    parser.add_argument("--trials", type=int, default=1000, help="grabs per ball count and grab chance")
+    parser.add_argument("--runs", type=int, default=None, help="seeded simulations per configuration (default: one per worker)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--bucket-width", type=int, default=50, help="width of the X buckets in pixels")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first simulation")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--concave-claw", action="store_true", help="collide with the claw's real outline instead of its hull")
+    parser.add_argument("--claw-vertices", type=int, default=CLAW_MAX_VERTICES, help="points per convex piece of the claw (default: every point)")
+    args = parser.parse_args()
+
+    runs = args.runs or args.workers
+    tasks = build_tasks(args.balls, args.grab_chance, args.trials, runs, args.seed, args.bucket_width)
+    pieces = load_claw_pieces(args.claw_vertices, args.concave_claw or CLAW_CONCAVE)
+    with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(pieces,)) as pool:
+        results = pool.map(run_simulation, tasks, chunksize=1)
+
+    summary = summarize(results, args.bucket_width)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(summary, file, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import pygame
+import numpy as np
+
+class RotationCache:
+    # Constants declaration
+    DEFAULT_STEP = 1  # Degrees covered by each rotation bin
+
+    def __init__(self, step_degrees=DEFAULT_STEP):
+        self.step = step_degrees
+        self.bin_count = max(1, int(round(360 / step_degrees)))
+        self.tables = {}  # image -> one (rotated surface, offset) entry per bin, filled on first use
+
+    # Returns the image rotated to the nearest bin, plus the offset that keeps it centered
+    def get(self, image, angle):
+        table = self.tables.get(image)
+        if table is None:
+            table = self.tables[image] = [None] * self.bin_count
+
+        index = int(round(angle / self.step)) % self.bin_count
+        entry = table[index]
+        if entry is None:
+            rotated = pygame.transform.rotate(image, index * self.step) if index else image
+            width, height = image.get_size()
+            rotated_width, rotated_height = rotated.get_size()
+            entry = table[index] = (rotated, (width // 2 - rotated_width // 2, height // 2 - rotated_height // 2))
+        return entry
+
+    # Returns the rotated image and where to draw it so it stays centered where the unrotated image would be
+    def place(self, image, topleft, angle):
+        rotated, offset = self.get(image, angle)
+        return rotated, (topleft[0] + offset[0], topleft[1] + offset[1])
+
+    # Same as place for many copies of the image at once (topleft positions and angles in degrees as arrays)
+    def place_many(self, image, topleft, angles):
+        indices = np.rint(angles / self.step).astype(int) % self.bin_count
+        table = self.tables.get(image)
+        if table is None:
+            table = self.tables[image] = [None] * self.bin_count
+        placements = []
+        for index, (x, y) in zip(indices.tolist(), topleft.tolist()):
+            rotated, offset = table[index] or self.get(image, index * self.step)
+            placements.append((rotated, (x + offset[0], y + offset[1])))
+        return placements
+
+    # Draws the image rotated around its center, like rotating it by hand but without a new surface every frame
+    def blit_rotate_center(self, surf, image, topleft, angle):
+        surf.blit(*self.place(image, topleft, angle))
+
+    def blit_many(self, surf, image, topleft, angles):
+        surf.blits(self.place_many(image, topleft, angles), doreturn=False)
+
+    def clear(self):
+        self.tables.clear()
@@ -0,0 +1,22 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+from asset_cache import AssetCache
+
+def test_shelf_layout_and_drawing_decode_each_image_once(tmp_path, monkeypatch):
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))  # convert_alpha needs a display
+    path = str(tmp_path / "prize.png")
+    pygame.image.save(pygame.Surface((200, 100), pygame.SRCALPHA), path)
+
+    loads = []
+    load = pygame.image.load
+    monkeypatch.setattr(pygame.image, "load", lambda *args: loads.append(args) or load(*args))
+
+    cache = AssetCache()
+    size = cache.fitted_size(path, (100, 100))
+    image = cache.get_fitted(path, (100, 100))
+    assert size == (100, 50)
+    assert image.get_size() == size
+    assert len(loads) == 1
@@ -0,0 +1,30 @@
+import json
+
+from asset_pack import AssetPack, MAGIC, HEADER, ALIGNMENT, image_key
+
+# Writes a pack holding one 2x2 image, returns its bytes
+def write_pack(filename):
+    index = json.dumps({"images": {}, "native_sizes": {"images/test.png": [2, 2]}, "sources": {}}).encode()
+    offset = -(-(HEADER.size + len(index) + 64) // ALIGNMENT) * ALIGNMENT  # Room for the offset digits in the index
+    index = json.dumps({"images": {image_key("images/test.png", (2, 2)): [offset, 2, 2]},
+                        "native_sizes": {"images/test.png": [2, 2]}, "sources": {}}).encode()
+    data = HEADER.pack(MAGIC, len(index)) + index
+    data += b"\0" * (offset - len(data)) + bytes(range(16))
+    with open(filename, 'wb') as file:
+        file.write(data)
+    return data
+
+def test_opens_a_complete_pack(tmp_path):
+    filename = str(tmp_path / "assets.pack")
+    write_pack(filename)
+    pack = AssetPack.open(filename)
+    assert pack is not None
+    assert pack.get("images/test.png").get_size() == (2, 2)
+
+def test_truncated_pack_falls_back_to_the_pngs(tmp_path):
+    filename = str(tmp_path / "assets.pack")
+    data = write_pack(filename)
+    for length in (0, 5, HEADER.size + 10, len(data) - 1):
+        with open(filename, 'wb') as file:
+            file.write(data[:length])
+        assert AssetPack.open(filename) is None, length
@@ -0,0 +1,19 @@
+import time
+
+from frame_profiler import FrameProfiler
+
+def test_turning_the_overlay_on_mid_frame_records_from_the_next_frame():
+    profiler = FrameProfiler()
+    profiler.begin_frame()
+    profiler.mark(profiler.EVENTS)
+    profiler.toggle_overlay()  # F3 read from this frame's events
+    profiler.mark(profiler.EVENTS)
+    profiler.end_frame()
+    assert profiler.frames == 0
+
+    profiler.begin_frame()
+    time.sleep(0.001)
+    profiler.mark(profiler.EVENTS)
+    profiler.end_frame()
+    assert profiler.frames == 1
+    assert 0.001 <= profiler.recorded()[0, profiler.EVENTS] < 1.0
@@ -0,0 +1,25 @@
+import json
+import pytest
+
+from input_log import ReplayInput, IncompatibleRecording, RECORDING_VERSION
+
+def write_recording(filename, header):
+    with open(filename, 'w') as file:
+        file.write(json.dumps(header) + "\n")
+
+def test_replays_the_current_format(tmp_path):
+    filename = str(tmp_path / "session.jsonl")
+    write_recording(filename, {"version": RECORDING_VERSION, "seed": 1, "start_time": "2026-01-01T00:00:00", "save_data": {}})
+    assert ReplayInput(filename).seed == 1
+
+def test_refuses_a_recording_without_a_version(tmp_path):
+    filename = str(tmp_path / "session.jsonl")
+    write_recording(filename, {"seed": 1, "start_time": "2026-01-01T00:00:00", "save_data": {}})
+    with pytest.raises(IncompatibleRecording, match="format 1"):
+        ReplayInput(filename)
+
+def test_replay_idles_the_way_the_recording_did(tmp_path):
+    filename = str(tmp_path / "session.jsonl")
+    write_recording(filename, {"version": RECORDING_VERSION, "seed": 1, "start_time": "2026-01-01T00:00:00",
+                               "low_power_idle": False, "save_data": {}})
+    assert ReplayInput(filename).low_power_idle is False
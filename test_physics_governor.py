@@ -0,0 +1,45 @@
+from physics_governor import PhysicsGovernor, PRESET_NAMES
+
+# Runs whole windows of frames that all took the given physics time
+def run_windows(governor, physics_ms, windows):
+    for _ in range(windows * governor.WINDOW):
+        governor.frame(physics_ms / 1000, 20)
+
+def test_steps_down_over_budget_and_back_up_with_room():
+    governor = PhysicsGovernor(6, log=lambda message: None)
+    run_windows(governor, 8, 1)
+    assert PRESET_NAMES[governor.level] == "low"
+    run_windows(governor, 2, governor.UPGRADE_WINDOWS)
+    assert PRESET_NAMES[governor.level] == "normal"
+    assert governor.summary() == (1, 1)
+
+def test_undone_step_up_doubles_the_wait_up_to_the_maximum():
+    governor = PhysicsGovernor(6, log=lambda message: None)
+    waits = []
+    for _ in range(8):
+        run_windows(governor, 8, 1)  # Over budget: down one preset
+        assert governor.level == governor.best + 1
+        waits.append(governor.upgrade_windows)
+        run_windows(governor, 2, governor.upgrade_windows)  # Room again: back up after the wait
+        assert governor.level == governor.best + 1 or governor.level == governor.best
+
+    # The first downgrade follows no step up, every later one undoes the step up before it
+    assert waits[:5] == [4, 8, 16, 32, 64]
+    assert waits[-1] == governor.MAX_UPGRADE_WINDOWS
+
+def test_wait_only_grows_when_a_step_up_is_undone():
+    governor = PhysicsGovernor(6, log=lambda message: None)
+    run_windows(governor, 8, 3)  # normal -> low -> minimal, no step up in between
+    assert PRESET_NAMES[governor.level] == "minimal"
+    assert governor.upgrade_windows == governor.UPGRADE_WINDOWS
+
+def test_wait_relaxes_once_the_best_preset_holds():
+    governor = PhysicsGovernor(6, log=lambda message: None)
+    for _ in range(3):
+        run_windows(governor, 8, 1)
+        run_windows(governor, 2, governor.upgrade_windows)
+    assert governor.upgrade_windows == 16
+    run_windows(governor, 2, 15)
+    assert governor.upgrade_windows == 16
+    run_windows(governor, 2, 1)
+    assert governor.upgrade_windows == governor.UPGRADE_WINDOWS
@@ -0,0 +1,38 @@
+from datetime import datetime
+import pytest
+
+from cabinet import Cabinet, COIN
+from physics_thread import PhysicsThread
+from prize_catalog import load_catalog
+from save_format import SaveData
+from save_journal import SaveJournal
+from timestep import FixedTimestep
+
+SQUARE = [[(-20, -20), (20, -20), (20, 20), (-20, 20)]]  # One convex piece per claw frame, the real outline isn't needed
+
+def make_cabinet():
+    pieces = [SQUARE] * 3
+    return Cabinet(700, (pieces, pieces[::-1]), SaveJournal(read_only=True), SaveData(datetime.now(), 5, 3),
+                   load_catalog(), FixedTimestep())
+
+def test_error_on_the_worker_is_raised_by_collect():
+    cabinet = make_cabinet()
+    def apply(command):
+        raise RuntimeError("boom")
+    cabinet.apply = apply
+
+    physics = PhysicsThread(cabinet)
+    physics.submit(1 / 60, [(COIN, True)], cabinet.quality)
+    with pytest.raises(RuntimeError, match="boom"):
+        physics.collect()
+    physics.thread.join(timeout=5)
+    assert not physics.thread.is_alive()
+    physics.close()  # The worker already stopped, closing must not wait for it
+
+def test_worker_snapshots_follow_the_submitted_frames():
+    cabinet = make_cabinet()
+    physics = PhysicsThread(cabinet)
+    coins = cabinet.coins
+    physics.submit(1 / 60, [(COIN, True)], cabinet.quality)
+    assert physics.collect().coins == coins + 1
+    physics.close()
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+import pytest
+
+from save_format import SaveData, HEADER, MAGIC, read_save
+from save_journal import SaveJournal
+
+CATALOG = {"Anime": {"Keychains": {"1": "a1.png", "2": "a2.png"}, "Pins": {"1": "p1.png"}},
+           "Games": {"Plushies": {"1": "g1.png"}}}  # Prize IDs 0 to 3 in this order
+
+PILE = [(100.0, 200.0, 0.5, 1.0, -2.0, 0.25, 1), (300.0, 250.0, -1.5, 0.0, 0.0, 0.0, 0)]
+
+def test_round_trips_the_won_bits_and_the_pile():
+    save_data = SaveData(datetime(2026, 3, 4, 5, 6, 7, 890), 7, 12, pile=PILE)
+    save_data.set_won(0)
+    save_data.set_won(9)
+
+    loaded = SaveData.from_bytes(save_data.to_bytes())
+    assert (loaded.saved_at, loaded.coins, loaded.balls) == (save_data.saved_at, 7, 12)
+    assert [prize_id for prize_id in range(16) if loaded.is_won(prize_id)] == [0, 9]
+    assert loaded.pile == PILE
+
+def test_reads_a_version_1_file_without_a_pile(tmp_path):
+    filename = str(tmp_path / "save-file.sav")
+    with open(filename, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, 1, 0, 3, 20, 0, 1) + bytes([0b100]))
+
+    loaded = read_save(filename)
+    assert (loaded.coins, loaded.balls) == (3, 20)
+    assert loaded.is_won(2)
+    assert loaded.pile == []
+
+def test_rejects_truncated_and_foreign_data():
+    data = SaveData(datetime(2026, 1, 1), 1, 2, b"\xff", PILE).to_bytes()
+    for cut in (HEADER.size - 1, HEADER.size, len(data) - 1):
+        with pytest.raises(ValueError, match="truncated"):
+            SaveData.from_bytes(data[:cut])
+    with pytest.raises(ValueError, match="not a save file"):
+        SaveData.from_bytes(b"NOTASAVE" + data[len(MAGIC):])
+
+def test_migrates_the_json_save_and_replays_legacy_journal_events(tmp_path):
+    with open(str(tmp_path / "save-file.json"), 'w') as file:
+        json.dump({"Last Saved DateTime": "2026-01-01T10:00:00", "Coins": 5, "Gacha Balls": 8, "Prizes": {
+            "Anime": {"Keychains": {"1": {"image": "a1.png", "won": True}, "2": {"image": "a2.png", "won": False}}}}}, file)
+    with open(str(tmp_path / "save-file.journal"), 'w') as file:
+        file.write(json.dumps({"type": "coin_spent", "coins": 4, "time": "2026-01-01T10:01:00"}) + "\n")
+        file.write(json.dumps({"type": "prize_won", "section": "Games", "subsection": "Plushies", "key": "1",
+                               "time": "2026-01-01T10:02:00"}) + "\n")
+
+    save_journal = SaveJournal(str(tmp_path / "save-file.sav"), read_only=True, catalog_sections=CATALOG)
+    loaded = save_journal.load()
+    assert (loaded.coins, loaded.balls) == (4, 8)
+    assert [prize_id for prize_id in range(4) if loaded.is_won(prize_id)] == [0, 3]
+    assert loaded.saved_at == datetime(2026, 1, 1, 10, 2)
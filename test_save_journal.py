@@ -0,0 +1,66 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from cabinet import Cabinet
+import claw_hull
+from claw_hull import load_claw_pieces
+from prize_catalog import load_catalog
+from save_format import SaveData
+from save_journal import SaveJournal, save_game_data
+from timestep import FixedTimestep
+
+# Waits until the writer has journaled the given number of events (the test then stops as if the game crashed)
+def wait_for_journal(save_journal, events):
+    deadline = time.monotonic() + 5
+    while len(save_journal.read_journal()) < events:
+        assert time.monotonic() < deadline, "the writer never journaled the events"
+        time.sleep(0.01)
+
+def test_refill_of_a_fresh_day_survives_a_crash(tmp_path, monkeypatch):
+    filename = str(tmp_path / "save-file.sav")
+    yesterday = datetime.now() - timedelta(days=1)
+    save_game_data(SaveData(yesterday, 5, 3), filename)
+
+    # The claw's hull cache is written under the working directory, keep it out of the repo
+    catalog_sections = load_catalog()
+    monkeypatch.setattr(claw_hull, "CLAW_IMAGES", [os.path.abspath(path) for path in claw_hull.CLAW_IMAGES])
+    monkeypatch.chdir(tmp_path)
+
+    save_journal = SaveJournal(filename, checkpoint_events=100, checkpoint_interval=3600, catalog_sections=catalog_sections)
+    save_data = save_journal.load()
+    save_journal.start(save_data)
+    try:
+        cabinet = Cabinet(700, load_claw_pieces(), save_journal, save_data, catalog_sections, FixedTimestep())
+        cabinet.start(datetime.now())
+        assert cabinet.balls_left() == Cabinet.DAILY_BALLS
+        coins = cabinet.coins
+        assert cabinet.drop()
+        wait_for_journal(save_journal, 2)  # Reloaded before close(): the final snapshot isn't written yet
+
+        reloaded = SaveJournal(filename, catalog_sections=catalog_sections).load()
+        assert reloaded.saved_at.date() == datetime.now().date()
+        assert reloaded.balls == Cabinet.DAILY_BALLS
+        assert reloaded.coins == coins - 1
+    finally:
+        save_journal.close(save_data)
+
+def test_events_after_a_torn_line_survive_the_next_crash(tmp_path):
+    filename = str(tmp_path / "save-file.sav")
+    save_game_data(SaveData(datetime.now(), 5, 3), filename)
+    save_journal = SaveJournal(filename, checkpoint_events=100, checkpoint_interval=3600)
+    with open(save_journal.journal_filename, 'w') as journal:
+        journal.write('{"type": "coin_sp')  # Torn by the crash before
+
+    save_data = save_journal.load()
+    save_journal.start(save_data)
+    try:
+        save_journal.record("coin_spent", coins=4)
+        save_journal.record("prize_won", prize=7)
+        wait_for_journal(save_journal, 2)
+
+        reloaded = SaveJournal(filename).load()  # Read while the writer still runs, as after a crash
+        assert reloaded.coins == 4
+        assert reloaded.is_won(7)
+    finally:
+        save_journal.close(save_data)
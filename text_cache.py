@@ -0,0 +1,45 @@
+import pygame
+from collections import OrderedDict
+
+class TextCache:
+    # Constants declaration
+    DEFAULT_CAPACITY = 256  # Rendered text surfaces kept around
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.fonts = {}  # (face, size) -> pygame Font, created once
+        self.surfaces = OrderedDict()  # (text, face, size, color, antialias) -> rendered surface, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the shared font object for the face (None is pygame's default font) and size
+    def font(self, size, face=None):
+        font = self.fonts.get((face, size))
+        if font is None:
+            font = self.fonts[(face, size)] = pygame.font.Font(face, size)
+        return font
+
+    # Returns the rendered text, rendering it only the first time it is asked for
+    def render(self, text, size, color, antialias=True, face=None):
+        key = (text, face, size, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.surfaces[key] = self.font(size, face).render(text, antialias, color)
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.surfaces),
+            "fonts": len(self.fonts),
+        }
@@ -0,0 +1,37 @@
+class FixedTimestep:
+    # Constants declaration
+    DEFAULT_RATE = 60  # Physics steps per second
+    DEFAULT_SUBSTEPS = 1  # space.step calls per fixed step
+    DEFAULT_MAX_STEPS = 5  # Steps allowed per rendered frame before dropping time
+
+    def __init__(self, step_rate=DEFAULT_RATE, substeps=DEFAULT_SUBSTEPS, max_steps_per_frame=DEFAULT_MAX_STEPS):
+        self.dt = 1.0 / step_rate  # Length of one fixed step in seconds
+        self.substeps = substeps
+        self.max_steps_per_frame = max_steps_per_frame
+        self.accumulator = 0.0  # Real time not simulated yet
+        self.dropped_time = 0.0  # Time thrown away to avoid falling further and further behind
+
+    # Adds the real time of the last frame and returns how many fixed steps to run now
+    def advance(self, frame_time):
+        self.accumulator += frame_time
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps_per_frame:
+            # Too far behind (slow frame or a blocking popup), drop the excess instead of spiralling
+            self.dropped_time += (steps - self.max_steps_per_frame) * self.dt
+            steps = self.max_steps_per_frame
+            self.accumulator = steps * self.dt
+        self.accumulator -= steps * self.dt
+        return steps
+
+    # Runs one fixed step of the physics simulation, split into substeps
+    def step_space(self, space):
+        substep_dt = self.dt / self.substeps
+        for _ in range(self.substeps):
+            space.step(substep_dt)
+
+    # How far the render time is between the last two physics states (0 to 1), used to interpolate drawing
+    def alpha(self):
+        return self.accumulator / self.dt
+
+    def reset(self):
+        self.accumulator = 0.0
@@ -0,0 +1,45 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# Claw and ball transforms of every cabinet, in shared memory so worker processes can hand them to the host without copying
+class TransformBuffer:
+    # Constants declaration
+    MAX_BALLS = 32  # Balls published per cabinet
+    CLAW_STATES = ("idle", "descending", "ascending")
+    STATUS, CLAW, FIRST_BALL = 0, 1, 2  # Rows per cabinet: (ball count, coins, claw state, claw frame), (claw x, y, angle), then (x, y, angle) per ball
+    SLOTS = 2  # Frames alternate between two copies, the host draws one while the workers fill the other
+
+    def __init__(self, cabinet_count, name=None):
+        shape = (self.SLOTS, cabinet_count, self.FIRST_BALL + self.MAX_BALLS, 4)
+        self.owner = name is None  # The host creates the block, the workers attach to it by name
+        self.shared_memory = shared_memory.SharedMemory(name=name, create=self.owner, size=int(np.prod(shape)) * 8)
+        self.name = self.shared_memory.name
+        self.array = np.ndarray(shape, dtype=np.float64, buffer=self.shared_memory.buf)
+        if self.owner:
+            self.array.fill(0)
+
+    # Writes where the cabinet is drawn this frame (between its last two physics steps)
+    def publish(self, slot, index, cabinet):
+        rows = self.array[slot, index]
+        claw = cabinet.claw
+        alpha = cabinet.timestep.alpha()
+        positions, angles = cabinet.gacha_prizes.interpolated(alpha)
+        count = min(len(positions), self.MAX_BALLS)
+        rows[self.STATUS] = (count, cabinet.coins, self.CLAW_STATES.index(claw.state), claw.current_frame)
+        claw_x, claw_y = claw.interpolated_position(alpha)
+        rows[self.CLAW, :3] = (claw_x, claw_y, claw.body.angle)
+        balls = rows[self.FIRST_BALL:self.FIRST_BALL + count]
+        balls[:, :2] = positions[:count]
+        balls[:, 2] = angles[:count]
+
+    # Returns (ball count, coins, claw state, claw frame), the claw row and the ball rows of a cabinet
+    def read(self, slot, index):
+        rows = self.array[slot, index]
+        count, coins, state, frame = rows[self.STATUS].astype(int).tolist()
+        return (count, coins, self.CLAW_STATES[state], frame), rows[self.CLAW], rows[self.FIRST_BALL:self.FIRST_BALL + count]
+
+    def close(self):
+        del self.array  # The mapping can't be closed while an array still points into it
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()